@@ -1,16 +1,46 @@
 from django.contrib import admin
 
-from .models import Category, Transaction
+from .models import Category, Job, MonthlySummary, Transaction
 
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
     list_display = ('name', 'user')
     list_filter = ('user',)
+    list_select_related = ('user',)
 
 
 @admin.register(Transaction)
 class TransactionAdmin(admin.ModelAdmin):
     list_display = ('amount', 'transaction_type', 'category', 'date', 'user')
     list_filter = ('transaction_type', 'category', 'date', 'user')
+    list_select_related = ('category', 'user')
     search_fields = ('description',)
+
+
+@admin.register(MonthlySummary)
+class MonthlySummaryAdmin(admin.ModelAdmin):
+    list_display = (
+        'month',
+        'transaction_type',
+        'category',
+        'total',
+        'count',
+        'user'
+    )
+    list_filter = ('transaction_type', 'user')
+    list_select_related = ('category', 'user')
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = (
+        'id',
+        'kind',
+        'status',
+        'user',
+        'created_at',
+        'finished_at'
+    )
+    list_filter = ('kind', 'status')
+    list_select_related = ('user',)
@@ -0,0 +1,105 @@
+import calendar
+from datetime import date, timedelta
+from functools import reduce
+from operator import or_
+
+from django.db.models import Q
+
+from .models import Transaction
+from .services import filter_transactions, sum_kopecks
+
+ROLLING_WINDOWS = (7, 30, 90)
+
+
+def shift_month(value, months):
+    month_index = value.year * 12 + value.month - 1 + months
+    year, month = divmod(month_index, 12)
+    day = min(value.day, calendar.monthrange(year, month + 1)[1])
+    return date(year, month + 1, day)
+
+
+def get_periods(as_of):
+    # Месяц сравнивается по одинаковому числу дней: текущий месяц до as_of
+    # с тем же отрезком прошлого месяца и того же месяца год назад.
+    periods = {
+        f'rolling_{days}': (as_of - timedelta(days=days - 1), as_of)
+        for days in ROLLING_WINDOWS
+    }
+    for name, months in (
+        ('month', 0),
+        ('previous_month', -1),
+        ('previous_year_month', -12),
+    ):
+        end = shift_month(as_of, months)
+        periods[name] = (end.replace(day=1), end)
+    return periods
+
+
+def change(current, previous):
+    return {
+        'change': current - previous,
+        'change_percent': (
+            round((current - previous) * 100 / previous, 1)
+            if previous else None
+        ),
+    }
+
+
+def build_row(values):
+    return {
+        **values,
+        'month_over_month': change(values['month'], values['previous_month']),
+        'year_over_year': change(
+            values['month'],
+            values['previous_year_month']
+        ),
+    }
+
+
+def get_spending_analytics(user, params, as_of):
+    periods = get_periods(as_of)
+    transactions = filter_transactions(
+        user,
+        {**params, 'start_date': '', 'end_date': ''}
+    ).filter(
+        # Только строки, попадающие хотя бы в одно окно: между прошлогодним
+        # месяцем и последними 90 днями почти год данных, которые не нужны.
+        reduce(or_, (Q(date__range=period) for period in periods.values())),
+        transaction_type=Transaction.EXPENSE
+    )
+
+    # Все окна — условные суммы в одном проходе GROUP BY по категориям:
+    # нужны только итоги окон на дату as_of, а не ряд по дням, поэтому
+    # оконные функции (и сортировка по дате внутри категории) не нужны.
+    rows = (
+        transactions
+        .values('category_id', 'category__name')
+        .annotate(**{
+            name: sum_kopecks('amount', filter=Q(date__range=period))
+            for name, period in periods.items()
+        })
+        .order_by()
+    )
+
+    categories = []
+    totals = dict.fromkeys(periods, 0)
+    for row in rows:
+        values = {name: row[name] or 0 for name in periods}
+        for name, value in values.items():
+            totals[name] += value
+        categories.append({
+            'category_id': row['category_id'],
+            'category': row['category__name'] or '',
+            **build_row(values),
+        })
+    categories.sort(key=lambda item: item['rolling_30'], reverse=True)
+
+    return {
+        'as_of': as_of.isoformat(),
+        'periods': {
+            name: [start.isoformat(), end.isoformat()]
+            for name, (start, end) in periods.items()
+        },
+        'total': build_row(totals),
+        'categories': categories,
+    }
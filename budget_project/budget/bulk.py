@@ -0,0 +1,56 @@
+from django.db import connections, transaction as db_transaction
+from django.db.models import Max, Min
+
+from .caching import mark_data_changed
+from .models import Transaction
+from .summaries import rebuild_monthly_summary
+
+DELETE = 'delete'
+RECATEGORIZE = 'recategorize'
+SET_TYPE = 'set_type'
+BULK_ACTIONS = [
+    (DELETE, 'Удалить'),
+    (RECATEGORIZE, 'Сменить категорию'),
+    (SET_TYPE, 'Сменить тип'),
+]
+
+
+def delete_transactions(transactions):
+    # delete() при подписанных post_delete сначала загружает все строки,
+    # чтобы разослать сигналы по одной, а здесь нужен один DELETE.
+    query, params = (
+        transactions.values('pk').order_by().query.sql_with_params()
+    )
+    with connections[transactions.db].cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {Transaction._meta.db_table} '
+            f'WHERE id IN ({query})',
+            params
+        )
+        return cursor.rowcount
+
+
+def apply_bulk_action(user, transactions, action, category=None,
+                      transaction_type=None):
+    transactions = transactions.filter(user=user)
+
+    with db_transaction.atomic():
+        bounds = transactions.aggregate(start=Min('date'), end=Max('date'))
+        if bounds['start'] is None:
+            return 0
+
+        if action == DELETE:
+            count = delete_transactions(transactions)
+        elif action == RECATEGORIZE:
+            count = transactions.update(category=category)
+        elif action == SET_TYPE:
+            count = transactions.update(transaction_type=transaction_type)
+        else:
+            raise ValueError(f'Неизвестное действие: {action}')
+
+        # update() и DELETE в обход ORM не отправляют сигналы, поэтому сводки
+        # пересчитываются за затронутые месяцы.
+        rebuild_monthly_summary([user], bounds['start'], bounds['end'])
+
+    mark_data_changed(user.id)
+    return count
@@ -0,0 +1,111 @@
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction as db_transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Category, DataVersion
+
+HITS_KEY = 'dashboard:stats:hits'
+MISSES_KEY = 'dashboard:stats:misses'
+
+
+def params_digest(params):
+    return hashlib.md5(
+        json.dumps(params, sort_keys=True).encode()
+    ).hexdigest()
+
+
+def dashboard_cache_key(user_id, version, section, params):
+    return f'dashboard:{user_id}:{version}:{section}:{params_digest(params)}'
+
+
+def get_category_names(user_id, version=None):
+    # Словарь id → название в порядке сортировки категорий. Версия берётся
+    # из БД: счётчик в локальном кэше одного процесса не увидели бы
+    # остальные, и формы принимали бы удалённые категории. Представления,
+    # которые уже прочитали DataVersion, передают её сами.
+    if version is None:
+        version = (
+            DataVersion.objects
+            .filter(user_id=user_id)
+            .values_list('categories_version', flat=True)
+            .first()
+        )
+    key = f'category_names:{user_id}:{version or 0}'
+    names = cache.get(key)
+    if names is None:
+        names = dict(
+            Category.objects
+            .filter(user_id=user_id)
+            .values_list('id', 'name')
+        )
+        cache.set(key, names, settings.CATEGORY_CACHE_TIMEOUT)
+    return names
+
+
+def touch_data_version(user_id, field='version'):
+    changes = {field: F(field) + 1}
+    if field == 'version':
+        changes['changed_at'] = timezone.now()
+    versions = DataVersion.objects.filter(user_id=user_id)
+    if versions.update(**changes):
+        return
+    try:
+        with db_transaction.atomic():
+            DataVersion.objects.create(
+                user_id=user_id,
+                changed_at=changes.get('changed_at'),
+                **{field: 1}
+            )
+    except IntegrityError:
+        versions.update(**changes)
+
+
+def mark_data_changed(user_id):
+    # Версия хранится в БД, а не в кэше: с locmem у каждого процесса свой
+    # кэш, и счётчик в нём не увидели бы остальные воркеры.
+    touch_data_version(user_id)
+
+
+def invalidate_categories(user_id):
+    touch_data_version(user_id, 'categories_version')
+
+
+async def aget_data_version(user_id):
+    data_version = await DataVersion.objects.filter(user_id=user_id).afirst()
+    return data_version or DataVersion(user_id=user_id)
+
+
+async def aincrement_counter(key):
+    try:
+        await cache.aincr(key)
+    except ValueError:
+        await cache.aadd(key, 0, None)
+        await cache.aincr(key)
+
+
+async def aget_cached_dashboard(user_id, version, section, params, compute):
+    # version — DataVersion.version, уже прочитанная представлением; по ней
+    # же строится ETag, так что тело и ETag не расходятся.
+    key = dashboard_cache_key(user_id, version, section, params)
+
+    payload = await cache.aget(key)
+    if payload is None:
+        await aincrement_counter(MISSES_KEY)
+        payload = await compute()
+        await cache.aset(key, payload, settings.DASHBOARD_CACHE_TIMEOUT)
+    else:
+        await aincrement_counter(HITS_KEY)
+    return payload
+
+
+def get_cache_stats():
+    stats = cache.get_many([HITS_KEY, MISSES_KEY])
+    return {
+        'hits': stats.get(HITS_KEY, 0),
+        'misses': stats.get(MISSES_KEY, 0),
+    }
@@ -0,0 +1,217 @@
+import csv
+import io
+import zlib
+
+from asgiref.sync import sync_to_async
+
+from .models import Transaction
+
+CHUNK_SIZE = 2000
+GZIP_BUFFER_SIZE = 64 * 1024
+STREAM_BUFFER_SIZE = 64 * 1024
+GZIP_LEVEL = 6
+ROW_GROUP_SIZE = 50000
+
+CSV_HEADER = ['Дата', 'Тип', 'Сумма (₽)', 'Категория', 'Описание']
+TRANSACTION_TYPE_LABELS = dict(Transaction.TRANSACTION_TYPES)
+
+
+class Echo:
+    def write(self, value):
+        return value
+
+
+def iter_values(transactions, category_names):
+    # Названия категорий берутся из кэша, а не JOIN-ом с таблицей категорий.
+    rows = transactions.values_list(
+        'date',
+        'transaction_type',
+        'amount',
+        'category_id',
+        'description'
+    ).iterator(chunk_size=CHUNK_SIZE)
+
+    for date, transaction_type, amount, category_id, description in rows:
+        yield (
+            date,
+            transaction_type,
+            amount,
+            category_names.get(category_id),
+            description
+        )
+
+
+def iter_export_rows(transactions, category_names):
+    for date, transaction_type, amount, category_name, description in (
+        iter_values(transactions, category_names)
+    ):
+        yield [
+            date,
+            TRANSACTION_TYPE_LABELS.get(transaction_type, transaction_type),
+            amount,
+            category_name or '',
+            description
+        ]
+
+
+def iter_csv(transactions, category_names):
+    writer = csv.writer(Echo())
+    yield writer.writerow(CSV_HEADER)
+    for row in iter_export_rows(transactions, category_names):
+        yield writer.writerow(row)
+
+
+def iter_csv_gzip(transactions, category_names):
+    # Сжатие на лету: заголовок gzip пишет сам zlib (wbits = 16 + MAX_WBITS),
+    # строки копятся в буфере, чтобы не вызывать compress на каждую.
+    compressor = zlib.compressobj(
+        GZIP_LEVEL,
+        zlib.DEFLATED,
+        16 + zlib.MAX_WBITS
+    )
+    buffer = []
+    size = 0
+    for line in iter_csv(transactions, category_names):
+        buffer.append(line)
+        size += len(line)
+        if size >= GZIP_BUFFER_SIZE:
+            chunk = compressor.compress(''.join(buffer).encode())
+            buffer = []
+            size = 0
+            if chunk:
+                yield chunk
+    yield compressor.compress(''.join(buffer).encode()) + compressor.flush()
+
+
+class ChunkSink(io.RawIOBase):
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def pop(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def arrow_schema():
+    import pyarrow as pa
+
+    return pa.schema([
+        ('date', pa.date32()),
+        ('transaction_type', pa.string()),
+        ('amount', pa.decimal128(15, 2)),
+        ('category', pa.string()),
+        ('description', pa.string()),
+    ])
+
+
+def iter_record_batches(transactions, category_names, schema):
+    import pyarrow as pa
+
+    columns = [[] for _ in schema]
+    for row in iter_values(transactions, category_names):
+        for column, value in zip(columns, row):
+            column.append(value)
+        if len(columns[0]) >= ROW_GROUP_SIZE:
+            yield pa.record_batch(columns, schema=schema)
+            columns = [[] for _ in schema]
+    if columns[0]:
+        yield pa.record_batch(columns, schema=schema)
+
+
+def iter_parquet(transactions, category_names):
+    import pyarrow.parquet as pq
+
+    # Каждая пачка записывается отдельной группой строк и сразу отдаётся
+    # клиенту; в памяти держится не больше ROW_GROUP_SIZE строк.
+    schema = arrow_schema()
+    sink = ChunkSink()
+    with pq.ParquetWriter(sink, schema, compression='zstd') as writer:
+        for batch in iter_record_batches(
+            transactions,
+            category_names,
+            schema
+        ):
+            writer.write_batch(batch)
+            yield sink.pop()
+    yield sink.pop()
+
+
+def iter_arrow(transactions, category_names):
+    import pyarrow as pa
+
+    schema = arrow_schema()
+    sink = ChunkSink()
+    with pa.ipc.new_file(sink, schema) as writer:
+        for batch in iter_record_batches(
+            transactions,
+            category_names,
+            schema
+        ):
+            writer.write_batch(batch)
+            yield sink.pop()
+    yield sink.pop()
+
+
+def take_chunks(chunks, size):
+    batch = []
+    for chunk in chunks:
+        batch.append(chunk.encode() if isinstance(chunk, str) else chunk)
+        size -= len(batch[-1])
+        if size <= 0:
+            break
+    return b''.join(batch)
+
+
+async def aiter_chunks(chunks):
+    # Синхронный итератор под ASGI StreamingHttpResponse сначала целиком
+    # собирает в список. Здесь он читается кусками по STREAM_BUFFER_SIZE в
+    # потоке запроса, где живёт и серверный курсор iterator().
+    try:
+        while True:
+            data = await sync_to_async(take_chunks)(
+                chunks,
+                STREAM_BUFFER_SIZE
+            )
+            if not data:
+                break
+            yield data
+    finally:
+        await sync_to_async(chunks.close)()
+
+
+def pyarrow_available():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+EXPORT_FORMATS = {
+    'csv': ('text/csv', 'transactions.csv', iter_csv),
+    'csv.gz': ('application/gzip', 'transactions.csv.gz', iter_csv_gzip),
+    'parquet': (
+        'application/vnd.apache.parquet',
+        'transactions.parquet',
+        iter_parquet
+    ),
+    'arrow': (
+        'application/vnd.apache.arrow.file',
+        'transactions.arrow',
+        iter_arrow
+    ),
+}
+PYARROW_FORMATS = {'parquet', 'arrow'}
@@ -0,0 +1,66 @@
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+
+from django import forms
+from django.core.exceptions import ValidationError
+from django.db import models
+from django.db.models.lookups import IntegerGreaterThanOrEqual, IntegerLessThan
+
+CENT = Decimal('0.01')
+MAX_DIGITS = 15
+MAX_AMOUNT = Decimal('9' * (MAX_DIGITS - 2) + '.99')
+
+
+class MoneyField(models.BigIntegerField):
+    # В БД сумма хранится целым числом копеек, в Python — Decimal в рублях,
+    # поэтому формы, шаблоны и экспорт работают с рублями как раньше.
+    description = 'Сумма в рублях (хранится в копейках)'
+
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return value
+        return Decimal(value).scaleb(-2)
+
+    def to_python(self, value):
+        if value is None:
+            return value
+        try:
+            return Decimal(str(value)).quantize(CENT, ROUND_HALF_UP)
+        except InvalidOperation:
+            raise ValidationError(
+                'Некорректная сумма: «%(value)s»',
+                code='invalid',
+                params={'value': value}
+            )
+
+    def get_prep_value(self, value):
+        value = models.Field.get_prep_value(self, value)
+        if value is None:
+            return value
+        return int(self.to_python(value).scaleb(2))
+
+    def formfield(self, **kwargs):
+        return models.Field.formfield(self, **{
+            'form_class': forms.DecimalField,
+            'max_digits': MAX_DIGITS,
+            'decimal_places': 2,
+            **kwargs,
+        })
+
+
+class MoneyFloatLookup:
+    # IntegerField округляет float вверх до целого ещё до перевода в
+    # копейки: amount__gte=19.99 превратилось бы в «не меньше 20 ₽».
+    def get_prep_lookup(self):
+        if isinstance(self.rhs, float):
+            self.rhs = Decimal(str(self.rhs))
+        return super().get_prep_lookup()
+
+
+@MoneyField.register_lookup
+class MoneyGreaterThanOrEqual(MoneyFloatLookup, IntegerGreaterThanOrEqual):
+    pass
+
+
+@MoneyField.register_lookup
+class MoneyLessThan(MoneyFloatLookup, IntegerLessThan):
+    pass
@@ -1,5 +1,6 @@
 from django import forms
 
+from .bulk import BULK_ACTIONS, SET_TYPE
 from .models import Category, Transaction
 
 
@@ -16,19 +17,27 @@ class CategoryForm(forms.ModelForm):
 
 
 class TransactionForm(forms.ModelForm):
+    # Категория выбирается из кэша названий пользователя, а не из queryset,
+    # поэтому показ и проверка формы не обращаются к таблице категорий.
+    category = forms.TypedChoiceField(
+        label='Категория',
+        coerce=int,
+        empty_value=None,
+        required=False,
+        widget=forms.Select(attrs={'class': 'form-select'})
+    )
+
     class Meta:
         model = Transaction
         fields = [
             'amount',
             'transaction_type',
-            'category',
             'date',
             'description'
         ]
         widgets = {
             'amount': forms.NumberInput(attrs={'class': 'form-control'}),
             'transaction_type': forms.Select(attrs={'class': 'form-select'}),
-            'category': forms.Select(attrs={'class': 'form-select'}),
             'date': forms.DateInput(
                 attrs={'type': 'date', 'class': 'form-control'},
                 format='%Y-%m-%d'
@@ -40,6 +49,77 @@ class TransactionForm(forms.ModelForm):
             }),
         }
 
+    def __init__(self, *args, category_names, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['category'].choices = [
+            ('', '---------'),
+            *category_names.items(),
+        ]
+        if self.instance.pk:
+            self.initial.setdefault('category', self.instance.category_id)
+
+    def save(self, commit=True):
+        self.instance.category_id = self.cleaned_data['category']
+        return super().save(commit)
+
+
+class ImportCSVForm(forms.Form):
+    file = forms.FileField(
+        label='CSV-файл',
+        widget=forms.ClearableFileInput(attrs={
+            'class': 'form-control',
+            'accept': '.csv,text/csv'
+        })
+    )
+
+
+class BulkTransactionForm(forms.Form):
+    action = forms.ChoiceField(label='Действие', choices=BULK_ACTIONS)
+    ids = forms.CharField(
+        label='Операции',
+        required=False,
+        help_text='Номера операций через запятую'
+    )
+    select_all = forms.BooleanField(
+        label='Все операции по текущему фильтру',
+        required=False
+    )
+    category = forms.ModelChoiceField(
+        label='Категория',
+        queryset=Category.objects.none(),
+        required=False
+    )
+    transaction_type = forms.ChoiceField(
+        label='Тип операции',
+        choices=Transaction.TRANSACTION_TYPES,
+        required=False
+    )
+
+    def __init__(self, *args, user, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['category'].queryset = Category.objects.filter(user=user)
+
+    def clean_ids(self):
+        try:
+            return [
+                int(value)
+                for value in self.cleaned_data['ids'].split(',')
+                if value.strip()
+            ]
+        except ValueError:
+            raise forms.ValidationError('Некорректный список операций')
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if not cleaned_data.get('ids') and not cleaned_data.get('select_all'):
+            raise forms.ValidationError('Не выбраны операции')
+        if (
+            cleaned_data.get('action') == SET_TYPE
+            and not cleaned_data.get('transaction_type')
+        ):
+            self.add_error('transaction_type', 'Укажите тип операции')
+        return cleaned_data
+
 
 class LoginForm(forms.Form):
     username = forms.CharField(
@@ -0,0 +1,217 @@
+import csv
+import time
+from collections import defaultdict
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction as db_transaction
+
+from .caching import (get_category_names, invalidate_categories,
+                      mark_data_changed)
+from .exports import CSV_HEADER, TRANSACTION_TYPE_LABELS
+from .fields import MAX_AMOUNT
+from .models import Category, Transaction
+from .summaries import add_to_summary, month_start
+
+CHUNK_SIZE = 5000
+MAX_REPORTED_ERRORS = 100
+
+TRANSACTION_TYPES_BY_LABEL = {
+    **{value: value for value in TRANSACTION_TYPE_LABELS},
+    **{
+        label.lower(): value
+        for value, label in TRANSACTION_TYPE_LABELS.items()
+    },
+}
+
+
+class ImportResult:
+    def __init__(self):
+        self.created = 0
+        self.categories_created = 0
+        self.error_count = 0
+        self.errors = []
+        self.elapsed = 0
+
+    @property
+    def rows_per_second(self):
+        if not self.elapsed:
+            return 0
+        return (self.created + self.error_count) / self.elapsed
+
+    def add_error(self, line_number, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line_number, message))
+
+
+def parse_date(value):
+    value = value.strip()
+    for parse in (
+        date.fromisoformat,
+        lambda value: datetime.strptime(value, '%d.%m.%Y').date()
+    ):
+        try:
+            return parse(value)
+        except ValueError:
+            continue
+    raise ValueError(f'Некорректная дата: «{value}»')
+
+
+def parse_amount(value):
+    cleaned = value.replace('\xa0', '').replace(' ', '').replace(',', '.')
+    try:
+        amount = Decimal(cleaned)
+    except InvalidOperation:
+        raise ValueError(f'Некорректная сумма: «{value}»')
+    if not amount.is_finite() or amount.as_tuple().exponent < -2:
+        raise ValueError(f'Некорректная сумма: «{value}»')
+    if abs(amount) > MAX_AMOUNT:
+        raise ValueError(f'Слишком большая сумма: «{value}»')
+    return amount
+
+
+def parse_transaction_type(value):
+    transaction_type = TRANSACTION_TYPES_BY_LABEL.get(value.strip().lower())
+    if transaction_type is None:
+        raise ValueError(f'Неизвестный тип операции: «{value}»')
+    return transaction_type
+
+
+def parse_row(row):
+    if len(row) != len(CSV_HEADER):
+        raise ValueError(
+            f'Ожидалось {len(CSV_HEADER)} столбцов, получено {len(row)}'
+        )
+    date_value, type_value, amount_value, category_name, description = row
+    return {
+        'date': parse_date(date_value),
+        'transaction_type': parse_transaction_type(type_value),
+        'amount': parse_amount(amount_value),
+        'category_name': category_name.strip()[:100],
+        'description': description,
+    }
+
+
+def resolve_categories(user, names, category_ids):
+    missing = names - category_ids.keys()
+    if missing:
+        created = Category.objects.bulk_create(
+            Category(name=name, user=user) for name in sorted(missing)
+        )
+        invalidate_categories(user.id)
+        category_ids.update(
+            Category.objects
+            .filter(user=user, name__in=missing)
+            .values_list('name', 'id')
+        )
+        return len(created)
+    return 0
+
+
+def save_chunk(user, rows, category_ids, result):
+    names = {row['category_name'] for row in rows if row['category_name']}
+
+    with db_transaction.atomic():
+        result.categories_created += resolve_categories(
+            user,
+            names,
+            category_ids
+        )
+
+        transactions = [
+            Transaction(
+                user=user,
+                date=row['date'],
+                transaction_type=row['transaction_type'],
+                amount=row['amount'],
+                category_id=category_ids.get(row['category_name']),
+                description=row['description'],
+            )
+            for row in rows
+        ]
+        Transaction.objects.bulk_create(transactions, batch_size=1000)
+
+        # bulk_create не отправляет сигналы, поэтому сводки обновляются
+        # одной дельтой на каждую комбинацию месяца, категории и типа.
+        deltas = defaultdict(lambda: [0, 0])
+        for item in transactions:
+            key = (
+                month_start(item.date),
+                item.category_id,
+                item.transaction_type
+            )
+            deltas[key][0] += item.amount
+            deltas[key][1] += 1
+        for (month, category_id, transaction_type), (total, count) in (
+            deltas.items()
+        ):
+            add_to_summary(
+                {
+                    'user_id': user.id,
+                    'month': month,
+                    'category_id': category_id,
+                    'transaction_type': transaction_type,
+                },
+                total,
+                count
+            )
+
+    result.created += len(transactions)
+
+
+def read_transactions(user, reader, chunk_size, result):
+    header = next(reader, None)
+    if header is None:
+        result.add_error(1, 'Файл пуст')
+        return
+    if [column.strip() for column in header] != CSV_HEADER:
+        result.add_error(
+            1,
+            'Неверный заголовок, ожидается: ' + ', '.join(CSV_HEADER)
+        )
+        return
+
+    category_ids = {
+        name: pk for pk, name in get_category_names(user.id).items()
+    }
+    chunk = []
+    try:
+        for row in reader:
+            if not any(cell.strip() for cell in row):
+                continue
+            try:
+                chunk.append(parse_row(row))
+            except ValueError as error:
+                result.add_error(reader.line_num, str(error))
+                continue
+            if len(chunk) >= chunk_size:
+                save_chunk(user, chunk, category_ids, result)
+                chunk = []
+    except UnicodeDecodeError:
+        # Файл декодируется блоками, поэтому чтение обрывается на первой
+        # ещё не прочитанной строке, а не точно на битом байте.
+        result.add_error(
+            reader.line_num + 1,
+            'Файл должен быть в кодировке UTF-8: строки, начиная с этой, '
+            'не импортированы'
+        )
+    if chunk:
+        save_chunk(user, chunk, category_ids, result)
+
+
+def import_transactions(user, lines, chunk_size=CHUNK_SIZE):
+    result = ImportResult()
+    started = time.perf_counter()
+
+    try:
+        try:
+            read_transactions(user, csv.reader(lines), chunk_size, result)
+        except UnicodeDecodeError:
+            result.add_error(1, 'Файл должен быть в кодировке UTF-8')
+    finally:
+        # Уже сохранённые пачки остаются в БД, даже если импорт прервался.
+        if result.created:
+            mark_data_changed(user.id)
+        result.elapsed = time.perf_counter() - started
+    return result
@@ -0,0 +1,159 @@
+import glob
+import json
+import logging
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import close_old_connections, transaction as db_transaction
+from django.utils import timezone
+
+from .caching import get_category_names
+from .exports import iter_csv
+from .models import Job
+from .reports import build_report
+from .services import filter_transactions, get_filter_params
+
+logger = logging.getLogger('budget.jobs')
+
+
+def result_path(job, extension):
+    directory = os.path.join(settings.JOBS_DIR, str(job.user_id))
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, f'{job.id}.{extension}')
+
+
+def run_export(job):
+    transactions = filter_transactions(
+        job.user,
+        get_filter_params(job.params)
+    ).order_by('-date', '-id')
+    category_names = get_category_names(job.user_id)
+    path = result_path(job, 'csv')
+    with open(path, 'w', encoding='utf-8', newline='') as file:
+        for line in iter_csv(transactions, category_names):
+            file.write(line)
+    return path
+
+
+def run_report(job):
+    report = build_report(
+        job.user,
+        filter_transactions(job.user, get_filter_params(job.params))
+    )
+    path = result_path(job, 'json')
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(report, file, ensure_ascii=False)
+    return path
+
+
+JOB_HANDLERS = {
+    Job.EXPORT_CSV: run_export,
+    Job.REPORT: run_report,
+}
+
+
+def touch_jobs(job_ids):
+    Job.objects.filter(id__in=job_ids, status=Job.RUNNING).update(
+        heartbeat_at=timezone.now()
+    )
+
+
+def fail_stale_jobs(user=None):
+    # Убитый воркер не успевает сменить статус своих задач, и без этого
+    # они навсегда остались бы «в работе» и занимали лимит пользователя.
+    now = timezone.now()
+    jobs = Job.objects.filter(
+        status=Job.RUNNING,
+        heartbeat_at__lt=now - timedelta(seconds=settings.JOBS_STALE_TIMEOUT)
+    )
+    if user is not None:
+        jobs = jobs.filter(user=user)
+    return jobs.update(
+        status=Job.FAILED,
+        error='Воркер перестал отвечать, задача прервана',
+        finished_at=now
+    )
+
+
+def delete_expired_jobs():
+    expired = Job.objects.filter(
+        created_at__lt=timezone.now() - timedelta(
+            days=settings.JOBS_RETENTION_DAYS
+        )
+    ).exclude(status__in=Job.ACTIVE_STATUSES)
+    for job_id, user_id in expired.values_list('id', 'user_id').iterator():
+        # По маске удаляются и недописанные файлы упавших задач.
+        for path in glob.glob(
+            os.path.join(settings.JOBS_DIR, str(user_id), f'{job_id}.*')
+        ):
+            os.remove(path)
+    return expired.delete()[0]
+
+
+def enqueue_job(user, kind, params):
+    with db_transaction.atomic():
+        # Блокировка строки пользователя не даёт параллельным запросам
+        # обойти лимит активных задач.
+        User.objects.select_for_update().filter(pk=user.pk).first()
+        fail_stale_jobs(user)
+        active = Job.objects.filter(
+            user=user,
+            status__in=Job.ACTIVE_STATUSES
+        ).count()
+        if active >= settings.JOBS_MAX_PER_USER:
+            return None
+        return Job.objects.create(user=user, kind=kind, params=params)
+
+
+def claim_job():
+    while True:
+        job_id = (
+            Job.objects
+            .filter(status=Job.PENDING)
+            .order_by('created_at')
+            .values_list('id', flat=True)
+            .first()
+        )
+        if job_id is None:
+            return None
+        # Задачу забирает тот воркер, чей UPDATE сменил статус первым.
+        now = timezone.now()
+        claimed = Job.objects.filter(id=job_id, status=Job.PENDING).update(
+            status=Job.RUNNING,
+            started_at=now,
+            heartbeat_at=now
+        )
+        if claimed:
+            return Job.objects.select_related('user').get(id=job_id)
+
+
+def run_job(job):
+    close_old_connections()
+    # Пока задача выполнялась, её могли признать зависшей: итог такого
+    # запуска не должен перезаписывать статус FAILED.
+    running = Job.objects.filter(id=job.id, status=Job.RUNNING)
+    try:
+        path = JOB_HANDLERS[job.kind](job)
+    except Exception as error:
+        running.update(
+            status=Job.FAILED,
+            error=str(error) or error.__class__.__name__,
+            finished_at=timezone.now()
+        )
+        raise
+    else:
+        finished = running.update(
+            status=Job.DONE,
+            result_file=path,
+            finished_at=timezone.now()
+        )
+        if not finished:
+            logger.warning(
+                'Задача %s уже снята с выполнения, результат удалён',
+                job.id
+            )
+            os.remove(path)
+    finally:
+        close_old_connections()
@@ -0,0 +1,709 @@
+import json
+import statistics
+import subprocess
+import threading
+import time
+import tracemalloc
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction as db_transaction
+from django.db.backends.signals import connection_created
+from django.db.models import BigIntegerField, Count, DecimalField, Sum
+from django.db.models.functions import Cast, TruncMonth
+from django.template import Context, Engine, engines
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+from budget.caching import get_category_names, mark_data_changed
+from budget.exports import EXPORT_FORMATS
+from budget.models import Category, Transaction
+from budget.partitioning import TABLE, get_partitions, is_partitioned
+from budget.reports import PERCENTILES, build_report
+from budget.services import (filter_transactions, get_filter_params,
+                             get_monthly_series)
+from budget.synthetic import generate_transactions
+
+
+class Rollback(Exception):
+    pass
+
+
+def monthly_series_python(transactions):
+    monthly_data = defaultdict(lambda: {'income': 0, 'expense': 0})
+    for trans in transactions:
+        month_key = trans.date.strftime('%Y-%m')
+        if trans.transaction_type == 'income':
+            monthly_data[month_key]['income'] += trans.amount
+        else:
+            monthly_data[month_key]['expense'] += trans.amount
+    return monthly_data
+
+
+def report_orm(transactions):
+    pivot = defaultdict(lambda: defaultdict(int))
+    balance = defaultdict(int)
+    for row in (
+        transactions
+        .annotate(month=TruncMonth('date'))
+        .values('month', 'category_id', 'transaction_type')
+        .annotate(total=Sum('amount'))
+        .order_by('month')
+    ):
+        if row['transaction_type'] == Transaction.INCOME:
+            balance[row['month']] += row['total']
+        else:
+            balance[row['month']] -= row['total']
+            pivot[row['category_id']][row['month']] += row['total']
+
+    cumulative = []
+    running = 0
+    for month in sorted(balance):
+        running += balance[month]
+        cumulative.append(running)
+
+    amounts = defaultdict(list)
+    for category_id, amount in transactions.filter(
+        transaction_type=Transaction.EXPENSE
+    ).values_list('category_id', 'amount'):
+        amounts[category_id].append(amount)
+    percentiles = {
+        category_id: [
+            statistics.quantiles(values, n=100, method='inclusive')[
+                percentile - 1
+            ]
+            for percentile in PERCENTILES
+        ]
+        for category_id, values in amounts.items()
+        if len(values) > 1
+    }
+    return pivot, cumulative, percentiles
+
+
+def measure(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def percentile(values, share):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, round(share * (len(ordered) - 1)))
+    return ordered[index]
+
+
+@contextmanager
+def rolled_back():
+    try:
+        with db_transaction.atomic():
+            yield
+            raise Rollback
+    except Rollback:
+        pass
+
+
+def iter_users(options):
+    if options['user']:
+        try:
+            user = User.objects.get(username=options['user'])
+        except User.DoesNotExist:
+            raise CommandError(f'Пользователь {options["user"]} не найден')
+        with rolled_back():
+            yield user
+        return
+    for count in options['rows']:
+        # Временные данные не зафиксированы, и параллельные запросы
+        # главной страницы из других соединений их бы не увидели.
+        with rolled_back(), override_settings(
+            DASHBOARD_PARALLEL_QUERIES=False
+        ):
+            user = User.objects.create(username=f'benchmark-{count}')
+            generate_transactions(user, count, seed=count)
+            yield user
+
+
+def bench_monthly(command, options):
+    for user in iter_users(options):
+        transactions = Transaction.objects.filter(user=user)
+        count = transactions.count()
+        sql_ms = measure(
+            lambda: get_monthly_series(transactions),
+            options['repeat']
+        )
+        python_ms = measure(
+            lambda: monthly_series_python(transactions.all()),
+            options['repeat']
+        )
+        command.stdout.write(
+            f'monthly rows={count:>9} '
+            f'sql={sql_ms:10.2f} ms python={python_ms:10.2f} ms'
+        )
+
+
+def bench_amounts(command, options):
+    results = []
+    for user in iter_users(options):
+        transactions = Transaction.objects.filter(user=user)
+        count = transactions.count()
+        kopecks = transactions.values_list(
+            Cast('amount', output_field=BigIntegerField()),
+            flat=True
+        )
+        variants = {
+            'sql_sum_bigint': lambda: transactions.aggregate(
+                total=Sum('amount')
+            ),
+            # Та же сумма по numeric — так считалось до перехода на копейки.
+            'sql_sum_numeric': lambda: transactions.aggregate(total=Sum(Cast(
+                'amount',
+                output_field=DecimalField(max_digits=17, decimal_places=0)
+            ))),
+            'python_sum_decimal': lambda: sum(
+                transactions.values_list('amount', flat=True),
+                Decimal(0)
+            ),
+            'python_sum_int': lambda: sum(kopecks.all()),
+        }
+        timings = {
+            name: measure(func, options['repeat'])
+            for name, func in variants.items()
+        }
+
+        copies = [
+            Transaction(
+                user=user,
+                amount=transaction.amount,
+                transaction_type=transaction.transaction_type,
+                category_id=transaction.category_id,
+                date=transaction.date,
+                description=transaction.description,
+            )
+            for transaction in transactions
+        ]
+        started = time.perf_counter()
+        Transaction.objects.bulk_create(copies, batch_size=1000)
+        timings['bulk_create'] = (time.perf_counter() - started) * 1000
+
+        for name, total_ms in timings.items():
+            result = {
+                'variant': name,
+                'rows': count,
+                'total_ms': round(total_ms, 2),
+            }
+            results.append(result)
+            command.stdout.write(
+                f'amounts {name:<18} rows={count:>9} '
+                f'total={result["total_ms"]:10.2f} ms'
+            )
+    return results
+
+
+def bench_report(command, options):
+    results = []
+    for user in iter_users(options):
+        transactions = Transaction.objects.filter(user=user)
+        count = transactions.count()
+        timings = {
+            'numpy': measure(
+                lambda: build_report(user, transactions),
+                options['repeat']
+            ),
+            'orm': measure(
+                lambda: report_orm(transactions),
+                options['repeat']
+            ),
+        }
+        for name, total_ms in timings.items():
+            results.append({
+                'variant': name,
+                'rows': count,
+                'total_ms': round(total_ms, 2),
+            })
+        command.stdout.write(
+            f'report rows={count:>9} '
+            f'numpy={timings["numpy"]:10.2f} ms orm={timings["orm"]:10.2f} ms'
+        )
+    return results
+
+
+def bench_export(command, options):
+    results = []
+    for user in iter_users(options):
+        transactions = (
+            Transaction.objects.filter(user=user).order_by('-date', '-id')
+        )
+        count = transactions.count()
+        category_names = get_category_names(user.id)
+        for name, (content_type, filename, iter_export) in (
+            EXPORT_FORMATS.items()
+        ):
+            size = 0
+            started = time.perf_counter()
+            for chunk in iter_export(transactions, category_names):
+                if isinstance(chunk, str):
+                    chunk = chunk.encode()
+                size += len(chunk)
+            total_ms = (time.perf_counter() - started) * 1000
+            results.append({
+                'format': name,
+                'rows': count,
+                'bytes': size,
+                'bytes_per_row': round(size / count, 2) if count else 0,
+                'total_ms': round(total_ms, 2),
+                'ms_per_million_rows': (
+                    round(total_ms * 1_000_000 / count, 2) if count else 0
+                ),
+            })
+            command.stdout.write(
+                f'export {name:>8} rows={count:>9} bytes={size:>12} '
+                f'{total_ms:10.2f} ms'
+            )
+    return results
+
+
+def bench_explain(command, options):
+    for user in iter_users(options):
+        category = Category.objects.filter(user=user).first()
+        end = date.today()
+        params = get_filter_params({
+            'start_date': (end - timedelta(days=90)).isoformat(),
+            'end_date': end.isoformat(),
+            'category': str(category.id) if category else '',
+        })
+        plain = filter_transactions(user, get_filter_params({}))
+        filtered = filter_transactions(user, params)
+        queries = {
+            'recent': plain.order_by('-date', '-id')[:5],
+            'summary': plain.values(
+                'transaction_type', 'category__name'
+            ).annotate(total=Sum('amount')).order_by(),
+            'by_type': plain.filter(
+                transaction_type=Transaction.EXPENSE,
+                date__gte=params['start_date']
+            ).values('transaction_type').annotate(
+                total=Sum('amount')
+            ).order_by(),
+            'export': filtered.order_by('-date', '-id'),
+        }
+        for name, queryset in queries.items():
+            command.stdout.write(f'--- {name} ({user.username})')
+            command.stdout.write(queryset.explain())
+
+
+def iter_plan_nodes(node):
+    yield node
+    for child in node.get('Plans', []):
+        yield from iter_plan_nodes(child)
+
+
+def analyze_plan(queryset):
+    plan = json.loads(queryset.explain(format='json', analyze=True))[0]
+    scanned = {
+        node['Relation Name']
+        for node in iter_plan_nodes(plan['Plan'])
+        if node.get('Relation Name', '').startswith(TABLE)
+    }
+    return len(scanned), plan['Planning Time'], plan['Execution Time']
+
+
+def bench_partitions(command, options):
+    if connection.vendor != 'postgresql':
+        raise CommandError(
+            'Сценарий partitions работает только с PostgreSQL'
+        )
+    with connection.cursor() as cursor:
+        partitioned = is_partitioned(cursor)
+        partitions = len(get_partitions(cursor)) if partitioned else 1
+
+    today = date.today()
+    windows = {'30d': 30, '90d': 90, '365d': 365, 'all': None}
+    results = []
+    for user in iter_users(options):
+        for window, days in windows.items():
+            params = get_filter_params({} if days is None else {
+                'start_date': (today - timedelta(days=days)).isoformat(),
+                'end_date': today.isoformat(),
+            })
+            transactions = filter_transactions(user, params)
+            queries = {
+                'summary': transactions.values(
+                    'transaction_type', 'category__name'
+                ).annotate(
+                    total=Sum('amount'),
+                    count=Count('id')
+                ).order_by(),
+                'recent': transactions.order_by('-date', '-id')[:5],
+                'export': transactions.order_by('-date', '-id'),
+            }
+            for name, queryset in queries.items():
+                timings = []
+                for _ in range(options['repeat']):
+                    scanned, planning_ms, execution_ms = analyze_plan(
+                        queryset
+                    )
+                    timings.append(planning_ms + execution_ms)
+                result = {
+                    'partitioned': partitioned,
+                    'partitions': partitions,
+                    'window': window,
+                    'query': name,
+                    'partitions_scanned': scanned,
+                    'median_ms': round(statistics.median(timings), 2),
+                }
+                results.append(result)
+                command.stdout.write(
+                    f'{window:>5} {name:<8} '
+                    f'scanned={scanned:>3}/{partitions:<3} '
+                    f'{result["median_ms"]:10.2f} ms'
+                )
+    return results
+
+
+def consume(response):
+    if response.streaming:
+        return sum(len(chunk) for chunk in response.streaming_content)
+    return len(response.content)
+
+
+def view_requests(user):
+    today = date.today()
+    month_start = today.replace(day=1)
+    category = Category.objects.filter(user=user).first()
+    quarter = {
+        'start_date': (today - timedelta(days=90)).isoformat(),
+        'end_date': today.isoformat(),
+    }
+    return {
+        'dashboard': ('get', reverse('dashboard'), {}),
+        'dashboard_month': ('get', reverse('dashboard'), {
+            'start_date': month_start.isoformat(),
+            'end_date': today.isoformat(),
+        }),
+        'dashboard_search': ('get', reverse('dashboard'), {'q': 'кофе'}),
+        'transactions_api': ('get', reverse('transactions_api'), {}),
+        'chart_data': ('get', reverse('chart_data'), {}),
+        'chart_data_search': ('get', reverse('chart_data'), {'q': 'кофе'}),
+        'analytics': ('get', reverse('analytics'), {}),
+        'report_api': ('get', reverse('report_api'), {}),
+        'export_csv': ('get', reverse('export_csv'), quarter),
+        'export_csv_all': ('get', reverse('export_csv'), {}),
+        'export_csv_gz_all': ('get', reverse('export_csv'), {
+            'format': 'csv.gz',
+        }),
+        'export_parquet_all': ('get', reverse('export_csv'), {
+            'format': 'parquet',
+        }),
+        'add_transaction_form': ('get', reverse('add_transaction'), {}),
+        'add_transaction': ('post', reverse('add_transaction'), {
+            'amount': '150.00',
+            'transaction_type': Transaction.EXPENSE,
+            'category': category.id if category else '',
+            'date': today.isoformat(),
+            'description': 'benchmark',
+        }),
+    }
+
+
+def bench_views(command, options):
+    results = []
+    for user in iter_users(options):
+        client = Client()
+        client.force_login(user)
+        rows = Transaction.objects.filter(user=user).count()
+
+        for name, (method, url, data) in view_requests(user).items():
+            timings = []
+            statuses = set()
+            for _ in range(options['repeat']):
+                if not options['warm_cache']:
+                    mark_data_changed(user.id)
+                started = time.perf_counter()
+                response = getattr(client, method)(url, data)
+                size = consume(response)
+                timings.append((time.perf_counter() - started) * 1000)
+                statuses.add(response.status_code)
+
+            if not options['warm_cache']:
+                mark_data_changed(user.id)
+            tracemalloc.start()
+            with CaptureQueriesContext(connection) as queries:
+                consume(getattr(client, method)(url, data))
+            peak_memory = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+            result = {
+                'view': name,
+                'rows': rows,
+                'status': sorted(statuses),
+                'p50_ms': round(percentile(timings, 0.5), 2),
+                'p95_ms': round(percentile(timings, 0.95), 2),
+                'queries': len(queries),
+                'peak_memory_kb': round(peak_memory / 1024, 1),
+                'response_bytes': size,
+            }
+            results.append(result)
+            command.stdout.write(
+                f'{name:<22} rows={rows:>9} '
+                f'p50={result["p50_ms"]:9.2f} ms '
+                f'p95={result["p95_ms"]:9.2f} ms '
+                f'queries={result["queries"]:>3} '
+                f'peak={result["peak_memory_kb"]:10.1f} KiB'
+            )
+    return results
+
+
+ROWS_TEMPLATE = (
+    "{% for transaction in transactions %}"
+    "{% include 'includes/transaction_row.html' %}"
+    "{% endfor %}"
+)
+
+
+def bench_rows(command, options):
+    cached_engine = engines['django'].engine
+    # Движок без кэширующего загрузчика и без кэша фрагментов: так строки
+    # рендерились до выноса в отдельный шаблон.
+    plain_engine = Engine(
+        dirs=cached_engine.dirs,
+        loaders=[
+            'django.template.loaders.filesystem.Loader',
+            'django.template.loaders.app_directories.Loader',
+        ],
+        libraries=cached_engine.libraries,
+    )
+    rows_template = cached_engine.get_template(
+        'includes/transaction_rows.html'
+    )
+
+    results = []
+    for user in iter_users(options):
+        transactions = list(
+            Transaction.objects
+            .filter(user=user)
+            .select_related('category')
+            .order_by('-date', '-id')
+        )
+        count = len(transactions)
+        data_version = time.time_ns()
+
+        def render_cold():
+            nonlocal data_version
+            data_version += 1
+            rows_template.render(Context({
+                'transactions': transactions,
+                'data_version': data_version,
+            }))
+
+        def render_warm():
+            rows_template.render(Context({
+                'transactions': transactions,
+                'data_version': data_version,
+            }))
+
+        timings = {
+            'before': measure(
+                lambda: plain_engine.from_string(ROWS_TEMPLATE).render(
+                    Context({'transactions': transactions})
+                ),
+                options['repeat']
+            ),
+            'cold': measure(render_cold, options['repeat']),
+        }
+        render_warm()
+        timings['warm'] = measure(render_warm, options['repeat'])
+
+        for name, total_ms in timings.items():
+            result = {
+                'variant': name,
+                'rows': count,
+                'total_ms': round(total_ms, 2),
+                'per_row_us': round(total_ms * 1000 / max(count, 1), 2),
+            }
+            results.append(result)
+            command.stdout.write(
+                f'rows {name:<6} rows={count:>9} '
+                f'total={result["total_ms"]:10.2f} ms '
+                f'per_row={result["per_row_us"]:8.2f} us'
+            )
+    return results
+
+
+def connection_mode():
+    if connection.settings_dict.get('OPTIONS', {}).get('pool'):
+        return 'pool'
+    if connection.settings_dict['CONN_MAX_AGE'] != 0:
+        return 'persistent'
+    return 'no-reuse'
+
+
+def bench_concurrency(command, options):
+    if not options['user']:
+        raise CommandError(
+            'Сценарий concurrency запускается только с --user: запросы идут '
+            'из разных потоков и соединений и не видят временных данных'
+        )
+    try:
+        user = User.objects.get(username=options['user'])
+    except User.DoesNotExist:
+        raise CommandError(f'Пользователь {options["user"]} не найден')
+
+    login_client = Client()
+    login_client.force_login(user)
+    urls = [
+        reverse('dashboard'),
+        reverse('transactions_api'),
+        reverse('chart_data'),
+    ]
+    mode = connection_mode()
+    opened = []
+    lock = threading.Lock()
+
+    def count_connection(sender, **kwargs):
+        with lock:
+            opened.append(sender)
+
+    def worker(requests):
+        client = Client()
+        client.cookies.update(login_client.cookies)
+        timings = []
+        statuses = set()
+        try:
+            for index in range(requests):
+                started = time.perf_counter()
+                response = client.get(urls[index % len(urls)])
+                consume(response)
+                timings.append((time.perf_counter() - started) * 1000)
+                statuses.add(response.status_code)
+        finally:
+            connection.close()
+        return timings, statuses
+
+    results = []
+    connection_created.connect(count_connection)
+    try:
+        for workers in options['concurrency']:
+            per_worker = max(1, options['requests'] // workers)
+            opened.clear()
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                outcomes = list(executor.map(worker, [per_worker] * workers))
+            elapsed = time.perf_counter() - started
+
+            timings = [value for outcome in outcomes for value in outcome[0]]
+            statuses = set().union(*(outcome[1] for outcome in outcomes))
+            result = {
+                'mode': mode,
+                'concurrency': workers,
+                'requests': len(timings),
+                'status': sorted(statuses),
+                'requests_per_second': round(len(timings) / elapsed, 1),
+                'p50_ms': round(percentile(timings, 0.5), 2),
+                'p95_ms': round(percentile(timings, 0.95), 2),
+                'connections_opened': len(opened),
+            }
+            results.append(result)
+            command.stdout.write(
+                f'{mode:<10} concurrency={workers:>3} '
+                f'rps={result["requests_per_second"]:8.1f} '
+                f'p50={result["p50_ms"]:9.2f} ms '
+                f'p95={result["p95_ms"]:9.2f} ms '
+                f'connections={result["connections_opened"]:>5}'
+            )
+    finally:
+        connection_created.disconnect(count_connection)
+    return results
+
+
+def current_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True,
+            text=True,
+            check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+SCENARIOS = {
+    'amounts': bench_amounts,
+    'concurrency': bench_concurrency,
+    'explain': bench_explain,
+    'export': bench_export,
+    'monthly': bench_monthly,
+    'partitions': bench_partitions,
+    'report': bench_report,
+    'rows': bench_rows,
+    'views': bench_views,
+}
+
+
+class Command(BaseCommand):
+    help = 'Замеры производительности на синтетических данных'
+
+    def add_arguments(self, parser):
+        parser.add_argument('scenario', choices=sorted(SCENARIOS))
+        parser.add_argument(
+            '--rows',
+            type=int,
+            nargs='+',
+            default=[1000, 10000, 100000],
+            help='Количество операций пользователя для каждого замера'
+        )
+        parser.add_argument(
+            '--user',
+            help='Мерить на существующем пользователе '
+                 '(например, созданном generate_data) вместо временного'
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help='Количество повторов каждого замера'
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            nargs='+',
+            default=[1, 8, 32],
+            help='Количество параллельных клиентов (сценарий concurrency)'
+        )
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=600,
+            help='Общее количество запросов на каждый уровень параллельности'
+        )
+        parser.add_argument(
+            '--warm-cache',
+            action='store_true',
+            help='Не сбрасывать кэш главной страницы между запросами'
+        )
+        parser.add_argument(
+            '--output',
+            help='Сохранить результаты в JSON-файл'
+        )
+
+    def handle(self, *args, **options):
+        results = SCENARIOS[options['scenario']](self, options)
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump({
+                    'scenario': options['scenario'],
+                    'commit': current_commit(),
+                    'created_at': datetime.now().isoformat(),
+                    'database': connection.vendor,
+                    'results': results or [],
+                }, file, ensure_ascii=False, indent=2)
+            self.stdout.write(f'Результаты сохранены в {options["output"]}')
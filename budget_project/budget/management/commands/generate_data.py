@@ -0,0 +1,81 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction as db_transaction
+
+from budget.caching import mark_data_changed
+from budget.synthetic import generate_transactions
+
+
+class Command(BaseCommand):
+    help = 'Создаёт пользователей с синтетической историей операций'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--users',
+            type=int,
+            default=1,
+            help='Количество пользователей'
+        )
+        parser.add_argument(
+            '--rows',
+            type=int,
+            default=1000,
+            help='Количество операций у каждого пользователя'
+        )
+        parser.add_argument(
+            '--categories',
+            type=int,
+            default=10,
+            help='Количество категорий у каждого пользователя'
+        )
+        parser.add_argument(
+            '--years',
+            type=int,
+            default=3,
+            help='Глубина истории в годах'
+        )
+        parser.add_argument(
+            '--prefix',
+            default='synthetic',
+            help='Префикс логинов создаваемых пользователей'
+        )
+        parser.add_argument(
+            '--password',
+            help='Пароль пользователей (по умолчанию вход по паролю закрыт)'
+        )
+        parser.add_argument('--seed', type=int, help='Зерно генератора')
+
+    def handle(self, *args, **options):
+        if options['rows'] < 0 or options['users'] < 1:
+            raise CommandError(
+                'Некорректное количество строк или пользователей'
+            )
+
+        for number in range(1, options['users'] + 1):
+            username = f'{options["prefix"]}-{number}'
+            if User.objects.filter(username=username).exists():
+                raise CommandError(f'Пользователь {username} уже существует')
+
+            started = time.perf_counter()
+            with db_transaction.atomic():
+                user = User(username=username)
+                if options['password']:
+                    user.set_password(options['password'])
+                else:
+                    user.set_unusable_password()
+                user.save()
+                seed = options['seed']
+                generate_transactions(
+                    user,
+                    options['rows'],
+                    categories=options['categories'],
+                    years=options['years'],
+                    seed=None if seed is None else seed + number
+                )
+            mark_data_changed(user.id)
+            self.stdout.write(
+                f'{username}: {options["rows"]} операций '
+                f'за {time.perf_counter() - started:.1f} с'
+            )
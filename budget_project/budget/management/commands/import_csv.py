@@ -0,0 +1,51 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from budget.imports import CHUNK_SIZE, import_transactions
+
+
+class Command(BaseCommand):
+    help = 'Импортирует операции пользователя из CSV в формате экспорта'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Путь к CSV-файлу')
+        parser.add_argument(
+            '--user',
+            required=True,
+            help='Логин пользователя, которому принадлежат операции'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=CHUNK_SIZE,
+            help='Количество строк в одной транзакции БД'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['user'])
+        except User.DoesNotExist:
+            raise CommandError(f'Пользователь {options["user"]} не найден')
+
+        try:
+            with open(
+                options['path'],
+                encoding='utf-8-sig',
+                newline=''
+            ) as lines:
+                result = import_transactions(
+                    user,
+                    lines,
+                    options['chunk_size']
+                )
+        except OSError as error:
+            raise CommandError(f'Не удалось прочитать файл: {error}')
+
+        for line_number, message in result.errors:
+            self.stderr.write(f'Строка {line_number}: {message}')
+        self.stdout.write(
+            f'Импортировано операций: {result.created}, '
+            f'новых категорий: {result.categories_created}, '
+            f'ошибок: {result.error_count}, '
+            f'{result.elapsed:.2f} с ({result.rows_per_second:.0f} строк/с)'
+        )
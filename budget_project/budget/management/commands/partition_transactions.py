@@ -0,0 +1,76 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from budget.partitioning import (INTERVALS, create_future_partitions,
+                                 get_partitions, is_partitioned,
+                                 migrate_to_partitions)
+
+
+class Command(BaseCommand):
+    help = (
+        'Секционирует таблицу операций по датам и создаёт секции на '
+        'будущие периоды (только PostgreSQL)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--migrate',
+            action='store_true',
+            help='Перенести существующую таблицу в секционированную'
+        )
+        parser.add_argument(
+            '--create-future',
+            action='store_true',
+            help='Создать недостающие секции на ближайшие периоды'
+        )
+        parser.add_argument(
+            '--interval',
+            choices=INTERVALS,
+            help=(
+                'Период одной секции; обязателен для --migrate, для '
+                '--create-future по умолчанию берётся из существующих секций'
+            )
+        )
+        parser.add_argument(
+            '--ahead',
+            type=int,
+            default=2,
+            help='На сколько периодов вперёд создавать секции'
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError(
+                'Секционирование поддерживается только для PostgreSQL'
+            )
+
+        if options['migrate'] and options['interval'] is None:
+            raise CommandError('Для --migrate укажите --interval')
+
+        created = []
+        try:
+            if options['migrate']:
+                created += migrate_to_partitions(
+                    options['interval'],
+                    options['ahead']
+                )
+                self.stdout.write(
+                    self.style.SUCCESS('Таблица операций секционирована')
+                )
+            if options['create_future']:
+                created += create_future_partitions(
+                    options['interval'],
+                    options['ahead']
+                )
+        except ValueError as error:
+            raise CommandError(str(error))
+
+        for name in created:
+            self.stdout.write(f'Создана секция {name}')
+
+        with connection.cursor() as cursor:
+            if not is_partitioned(cursor):
+                self.stdout.write('Таблица операций не секционирована')
+                return
+            for name, bound in get_partitions(cursor):
+                self.stdout.write(f'{name}: {bound}')
@@ -0,0 +1,42 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from budget.summaries import rebuild_monthly_summary, verify_monthly_summary
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает или проверяет помесячные сводки по операциям'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            action='append',
+            dest='usernames',
+            help='Логин пользователя (можно указать несколько раз)'
+        )
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help='Только сравнить сводки с операциями, ничего не меняя'
+        )
+
+    def handle(self, *args, **options):
+        users = None
+        if options['usernames']:
+            users = User.objects.filter(username__in=options['usernames'])
+            if users.count() != len(set(options['usernames'])):
+                raise CommandError('Не все пользователи найдены')
+
+        if not options['verify']:
+            rebuild_monthly_summary(users)
+            self.stdout.write(self.style.SUCCESS('Сводки пересчитаны'))
+            return
+
+        mismatches = verify_monthly_summary(users)
+        for key, expected, actual in mismatches:
+            self.stdout.write(
+                f'{key}: ожидалось {expected}, в сводке {actual}'
+            )
+        if mismatches:
+            raise CommandError(f'Расхождений: {len(mismatches)}')
+        self.stdout.write(self.style.SUCCESS('Сводки совпадают с операциями'))
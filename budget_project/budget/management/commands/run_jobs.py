@@ -0,0 +1,93 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from budget.jobs import (claim_job, delete_expired_jobs, fail_stale_jobs,
+                         run_job, touch_jobs)
+
+CLEANUP_INTERVAL = 3600
+
+
+class Command(BaseCommand):
+    help = 'Выполняет фоновые задачи (экспорт, отчёты) из очереди в БД'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=2,
+            help='Количество задач, выполняемых одновременно'
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=2,
+            help='Пауза между проверками очереди, секунд'
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Выполнить задачи из очереди и завершиться'
+        )
+
+    def report(self, future, job):
+        error = future.exception()
+        if error is None:
+            self.stdout.write(self.style.SUCCESS(f'Задача #{job.id} готова'))
+        else:
+            self.stderr.write(f'Задача #{job.id} завершилась ошибкой: {error}')
+
+    def clean_up(self):
+        stale = fail_stale_jobs()
+        if stale:
+            self.stderr.write(f'Прервано зависших задач: {stale}')
+        deleted = delete_expired_jobs()
+        if deleted:
+            self.stdout.write(f'Удалено старых задач: {deleted}')
+
+    def handle(self, *args, **options):
+        workers = max(1, options['workers'])
+        running = {}
+        cleaned_at = None
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            try:
+                while True:
+                    close_old_connections()
+                    if running:
+                        touch_jobs([job.id for job in running.values()])
+                    if (
+                        cleaned_at is None
+                        or time.monotonic() - cleaned_at > CLEANUP_INTERVAL
+                    ):
+                        self.clean_up()
+                        cleaned_at = time.monotonic()
+                    queue_empty = False
+                    while len(running) < workers:
+                        job = claim_job()
+                        if job is None:
+                            queue_empty = True
+                            break
+                        self.stdout.write(
+                            f'Задача #{job.id} ({job.kind}) запущена'
+                        )
+                        running[executor.submit(run_job, job)] = job
+
+                    if options['once'] and queue_empty and not running:
+                        break
+                    if not running:
+                        time.sleep(options['poll_interval'])
+                        continue
+
+                    done, _ = wait(
+                        running,
+                        timeout=options['poll_interval'],
+                        return_when=FIRST_COMPLETED
+                    )
+                    for future in done:
+                        self.report(future, running.pop(future))
+            except KeyboardInterrupt:
+                self.stdout.write('Остановка: ждём завершения текущих задач')
+            for future in wait(running).done:
+                self.report(future, running[future])
@@ -0,0 +1,114 @@
+import cProfile
+import heapq
+import itertools
+import json
+import logging
+import os
+import random
+import threading
+import time
+from contextlib import ExitStack
+from contextvars import ContextVar
+from datetime import datetime
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger('budget.profiling')
+# Через него запросы из потоков run_query со своими соединениями тоже
+# попадают в замер текущего запроса.
+active_recorder = ContextVar('active_recorder', default=None)
+
+
+class QueryRecorder:
+    def __init__(self, keep_slowest):
+        self.count = 0
+        self.duration = 0
+        self.keep_slowest = keep_slowest
+        self.slowest = []
+        self.counter = itertools.count()
+        self.lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            with self.lock:
+                self.count += 1
+                self.duration += elapsed
+                heapq.heappush(
+                    self.slowest,
+                    (elapsed, next(self.counter), sql)
+                )
+                if len(self.slowest) > self.keep_slowest:
+                    heapq.heappop(self.slowest)
+
+    def slowest_statements(self):
+        return [
+            {'ms': round(elapsed * 1000, 2), 'sql': sql}
+            for elapsed, _, sql in sorted(self.slowest, reverse=True)
+        ]
+
+
+class RequestProfilingMiddleware:
+    def __init__(self, get_response):
+        if not settings.PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorder = QueryRecorder(settings.PROFILING_SLOW_QUERIES)
+        profiler = None
+        if random.random() < settings.PROFILING_SAMPLE_RATE:
+            profiler = cProfile.Profile()
+
+        started = time.perf_counter()
+        token = active_recorder.set(recorder)
+        with ExitStack() as stack:
+            stack.callback(active_recorder.reset, token)
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            if profiler is not None:
+                profiler.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                if profiler is not None:
+                    profiler.disable()
+        total = time.perf_counter() - started
+
+        response['Server-Timing'] = (
+            f'app;dur={total * 1000:.1f}, '
+            f'db;dur={recorder.duration * 1000:.1f};'
+            f'desc="{recorder.count} queries"'
+        )
+
+        profile_path = None
+        if profiler is not None:
+            profile_path = self.dump_profile(profiler, request)
+
+        logger.info(json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'user_id': getattr(getattr(request, 'user', None), 'id', None),
+            'total_ms': round(total * 1000, 2),
+            'db_ms': round(recorder.duration * 1000, 2),
+            'queries': recorder.count,
+            'slowest': recorder.slowest_statements(),
+            'profile': profile_path,
+        }, ensure_ascii=False))
+        return response
+
+    def dump_profile(self, profiler, request):
+        os.makedirs(settings.PROFILING_DIR, exist_ok=True)
+        slug = request.path.strip('/').replace('/', '_') or 'root'
+        path = os.path.join(
+            settings.PROFILING_DIR,
+            f'{datetime.now():%Y%m%d-%H%M%S-%f}-{slug}.prof'
+        )
+        profiler.dump_stats(path)
+        return path
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.7 on 2026-10-18 17:50
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth
+
+
+def fill_monthly_summary(apps, schema_editor):
+    Transaction = apps.get_model('budget', 'Transaction')
+    MonthlySummary = apps.get_model('budget', 'MonthlySummary')
+    rows = (
+        Transaction.objects
+        .annotate(month=TruncMonth('date'))
+        .values('user_id', 'month', 'category_id', 'transaction_type')
+        .annotate(total=Sum('amount'), count=Count('id'))
+        .order_by()
+    )
+    MonthlySummary.objects.bulk_create(
+        (MonthlySummary(**row) for row in rows.iterator()),
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('budget', '0005_transaction_description_trgm'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlySummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(verbose_name='Месяц')),
+                ('transaction_type', models.CharField(choices=[('income', 'Доход'), ('expense', 'Расход')], max_length=10, verbose_name='Тип операции')),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Сумма')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='Количество операций')),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='budget.category', verbose_name='Категория')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Сводка за месяц',
+                'verbose_name_plural': 'Сводки за месяц',
+                'ordering': ['month'],
+                'constraints': [models.UniqueConstraint(fields=('user', 'month', 'category', 'transaction_type'), name='monthly_summary_unique')],
+            },
+        ),
+        migrations.RunPython(fill_monthly_summary, migrations.RunPython.noop),
+    ]
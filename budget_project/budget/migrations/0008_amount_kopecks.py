@@ -0,0 +1,87 @@
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import BigIntegerField, DecimalField, F, Value
+from django.db.models.functions import Cast, Round
+
+# В bigint помещается до 19 цифр: приведение к более узкому numeric
+# переполнилось бы на суммах от миллиона рублей ещё до деления на 100.
+KOPECKS = DecimalField(max_digits=19, decimal_places=0)
+
+
+def to_kopecks(apps, schema_editor):
+    Transaction = apps.get_model('budget', 'Transaction')
+    MonthlySummary = apps.get_model('budget', 'MonthlySummary')
+    Transaction.objects.update(
+        amount_kopecks=Cast(
+            Round(F('amount') * 100),
+            output_field=BigIntegerField()
+        )
+    )
+    MonthlySummary.objects.update(
+        total_kopecks=Cast(
+            Round(F('total') * 100),
+            output_field=BigIntegerField()
+        )
+    )
+
+
+def to_rubles(apps, schema_editor):
+    Transaction = apps.get_model('budget', 'Transaction')
+    MonthlySummary = apps.get_model('budget', 'MonthlySummary')
+    Transaction.objects.update(
+        amount=Cast(
+            F('amount_kopecks'),
+            output_field=KOPECKS
+        ) * Value(Decimal('0.01'))
+    )
+    MonthlySummary.objects.update(
+        total=Cast(
+            F('total_kopecks'),
+            output_field=KOPECKS
+        ) * Value(Decimal('0.01'))
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('budget', '0007_dataversion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transaction',
+            name='amount_kopecks',
+            field=models.BigIntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name='monthlysummary',
+            name='total_kopecks',
+            field=models.BigIntegerField(null=True),
+        ),
+        # Старые столбцы становятся необязательными, чтобы при откате их
+        # можно было вернуть пустыми и заполнить из копеек.
+        migrations.AlterField(
+            model_name='transaction',
+            name='amount',
+            field=models.DecimalField(
+                decimal_places=2,
+                max_digits=10,
+                null=True,
+                verbose_name='Сумма'
+            ),
+        ),
+        migrations.AlterField(
+            model_name='monthlysummary',
+            name='total',
+            field=models.DecimalField(
+                decimal_places=2,
+                default=0,
+                max_digits=14,
+                null=True,
+                verbose_name='Сумма'
+            ),
+        ),
+        migrations.RunPython(to_kopecks, to_rubles),
+    ]
@@ -0,0 +1,40 @@
+import budget.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('budget', '0008_amount_kopecks'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='transaction',
+            name='amount',
+        ),
+        migrations.RemoveField(
+            model_name='monthlysummary',
+            name='total',
+        ),
+        migrations.RenameField(
+            model_name='transaction',
+            old_name='amount_kopecks',
+            new_name='amount',
+        ),
+        migrations.RenameField(
+            model_name='monthlysummary',
+            old_name='total_kopecks',
+            new_name='total',
+        ),
+        migrations.AlterField(
+            model_name='transaction',
+            name='amount',
+            field=budget.fields.MoneyField(verbose_name='Сумма'),
+        ),
+        migrations.AlterField(
+            model_name='monthlysummary',
+            name='total',
+            field=budget.fields.MoneyField(default=0, verbose_name='Сумма'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.7 on 2026-10-18 23:05
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Min, Sum
+
+
+def merge_uncategorized_duplicates(apps, schema_editor):
+    MonthlySummary = apps.get_model('budget', 'MonthlySummary')
+    uncategorized = MonthlySummary.objects.filter(category__isnull=True)
+    duplicates = (
+        uncategorized
+        .values('user_id', 'month', 'transaction_type')
+        .annotate(
+            rows=Count('id'),
+            keep_id=Min('id'),
+            merged_total=Sum('total'),
+            merged_count=Sum('count')
+        )
+        .filter(rows__gt=1)
+        .order_by()
+    )
+    for row in duplicates:
+        group = uncategorized.filter(
+            user_id=row['user_id'],
+            month=row['month'],
+            transaction_type=row['transaction_type']
+        )
+        group.exclude(id=row['keep_id']).delete()
+        group.update(total=row['merged_total'], count=row['merged_count'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('budget', '0010_job'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            merge_uncategorized_duplicates,
+            migrations.RunPython.noop
+        ),
+        migrations.AddConstraint(
+            model_name='monthlysummary',
+            constraint=models.UniqueConstraint(condition=models.Q(('category__isnull', True)), fields=('user', 'month', 'transaction_type'), name='monthly_summary_unique_uncategorized'),
+        ),
+    ]
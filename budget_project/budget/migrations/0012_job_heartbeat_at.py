@@ -0,0 +1,25 @@
+# Generated by Django 5.2.7 on 2026-10-18 23:20
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def fill_heartbeat(apps, schema_editor):
+    Job = apps.get_model('budget', 'Job')
+    Job.objects.filter(status='running').update(heartbeat_at=F('started_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('budget', '0011_monthlysummary_uncategorized_unique'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Последний сигнал воркера'),
+        ),
+        migrations.RunPython(fill_heartbeat, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 23:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('budget', '0012_job_heartbeat_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dataversion',
+            name='categories_version',
+            field=models.PositiveBigIntegerField(default=0, verbose_name='Версия категорий'),
+        ),
+    ]
@@ -1,6 +1,8 @@
 from django.contrib.auth.models import User
 from django.db import models
 
+from .fields import MoneyField
+
 
 class Category(models.Model):
     name = models.CharField(
@@ -30,11 +32,7 @@ class Transaction(models.Model):
         (EXPENSE, 'Расход'),
     ]
 
-    amount = models.DecimalField(
-        'Сумма',
-        max_digits=10,
-        decimal_places=2
-    )
+    amount = MoneyField('Сумма')
     transaction_type = models.CharField(
         'Тип операции',
         max_length=10,
@@ -57,8 +55,155 @@ class Transaction(models.Model):
 
     class Meta:
         ordering = ['-date']
+        indexes = [
+            models.Index(
+                fields=['user', '-date', '-id'],
+                name='transaction_user_date_idx'
+            ),
+            models.Index(
+                fields=['user', 'transaction_type', 'date'],
+                name='transaction_user_type_idx'
+            ),
+            models.Index(
+                fields=['user', 'category', 'date'],
+                name='transaction_user_category_idx'
+            ),
+        ]
         verbose_name = 'Операция'
         verbose_name_plural = 'Операции'
 
     def __str__(self):
         return f'{self.transaction_type}: {self.amount} ₽'
+
+
+class MonthlySummary(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        verbose_name='Пользователь'
+    )
+    month = models.DateField('Месяц')
+    category = models.ForeignKey(
+        Category,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        verbose_name='Категория'
+    )
+    transaction_type = models.CharField(
+        'Тип операции',
+        max_length=10,
+        choices=Transaction.TRANSACTION_TYPES
+    )
+    total = MoneyField('Сумма', default=0)
+    count = models.PositiveIntegerField('Количество операций', default=0)
+
+    class Meta:
+        ordering = ['month']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'month', 'category', 'transaction_type'],
+                name='monthly_summary_unique'
+            ),
+            # NULL в уникальном ограничении не совпадает с другим NULL,
+            # поэтому строки без категории защищены отдельным индексом.
+            models.UniqueConstraint(
+                fields=['user', 'month', 'transaction_type'],
+                condition=models.Q(category__isnull=True),
+                name='monthly_summary_unique_uncategorized'
+            ),
+        ]
+        verbose_name = 'Сводка за месяц'
+        verbose_name_plural = 'Сводки за месяц'
+
+    def __str__(self):
+        return f'{self.month:%Y-%m} {self.transaction_type}: {self.total} ₽'
+
+
+class DataVersion(models.Model):
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        verbose_name='Пользователь'
+    )
+    version = models.PositiveBigIntegerField('Версия', default=0)
+    categories_version = models.PositiveBigIntegerField(
+        'Версия категорий',
+        default=0
+    )
+    changed_at = models.DateTimeField('Изменено', null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Версия данных'
+        verbose_name_plural = 'Версии данных'
+
+    def __str__(self):
+        return f'{self.user_id}: {self.version}'
+
+
+class Job(models.Model):
+    EXPORT_CSV = 'export_csv'
+    REPORT = 'report'
+    KINDS = [
+        (EXPORT_CSV, 'Экспорт CSV'),
+        (REPORT, 'Отчёт по категориям'),
+    ]
+
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = [
+        (PENDING, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Готово'),
+        (FAILED, 'Ошибка'),
+    ]
+    ACTIVE_STATUSES = [PENDING, RUNNING]
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        verbose_name='Пользователь'
+    )
+    kind = models.CharField('Тип задачи', max_length=20, choices=KINDS)
+    params = models.JSONField('Параметры', default=dict, blank=True)
+    status = models.CharField(
+        'Статус',
+        max_length=10,
+        choices=STATUSES,
+        default=PENDING
+    )
+    result_file = models.CharField(
+        'Файл результата',
+        max_length=255,
+        blank=True
+    )
+    error = models.TextField('Ошибка', blank=True)
+    created_at = models.DateTimeField('Создана', auto_now_add=True)
+    started_at = models.DateTimeField('Запущена', null=True, blank=True)
+    finished_at = models.DateTimeField('Завершена', null=True, blank=True)
+    heartbeat_at = models.DateTimeField(
+        'Последний сигнал воркера',
+        null=True,
+        blank=True
+    )
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(
+                fields=['status', 'created_at'],
+                name='job_status_idx'
+            ),
+            models.Index(
+                fields=['user', 'status'],
+                name='job_user_status_idx'
+            ),
+        ]
+        verbose_name = 'Фоновая задача'
+        verbose_name_plural = 'Фоновые задачи'
+
+    def __str__(self):
+        return f'{self.get_kind_display()} #{self.id}: {self.status}'
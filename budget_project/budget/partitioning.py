@@ -0,0 +1,212 @@
+from datetime import date
+
+from django.db import connection, transaction as db_transaction
+
+from .models import Transaction
+from .summaries import next_month_start
+
+TABLE = Transaction._meta.db_table
+OLD_TABLE = f'{TABLE}_old'
+SEQUENCE = f'{TABLE}_part_id_seq'
+DEFAULT_PARTITION = f'{TABLE}_default'
+
+YEAR = 'year'
+MONTH = 'month'
+INTERVALS = (YEAR, MONTH)
+INTERVAL_PREFIXES = {YEAR: f'{TABLE}_y', MONTH: f'{TABLE}_m'}
+
+
+def period_start(value, interval):
+    if interval == YEAR:
+        return value.replace(month=1, day=1)
+    return value.replace(day=1)
+
+
+def next_period(value, interval):
+    if interval == YEAR:
+        return period_start(value, YEAR).replace(year=value.year + 1)
+    return next_month_start(value)
+
+
+def partition_name(start, interval):
+    if interval == YEAR:
+        return f'{INTERVAL_PREFIXES[YEAR]}{start:%Y}'
+    return f'{INTERVAL_PREFIXES[MONTH]}{start:%Y_%m}'
+
+
+def iter_periods(start, end, interval):
+    current = period_start(start, interval)
+    while current <= end:
+        following = next_period(current, interval)
+        yield current, following
+        current = following
+
+
+def shift_periods(value, interval, count):
+    value = period_start(value, interval)
+    for _ in range(count):
+        value = next_period(value, interval)
+    return value
+
+
+def is_partitioned(cursor):
+    cursor.execute(
+        'SELECT 1 FROM pg_partitioned_table WHERE partrelid = %s::regclass',
+        [TABLE]
+    )
+    return cursor.fetchone() is not None
+
+
+def get_partitions(cursor):
+    cursor.execute(
+        'SELECT child.relname, pg_get_expr(child.relpartbound, child.oid) '
+        'FROM pg_inherits '
+        'JOIN pg_class child ON child.oid = pg_inherits.inhrelid '
+        'WHERE pg_inherits.inhparent = %s::regclass '
+        'ORDER BY child.relname',
+        [TABLE]
+    )
+    return cursor.fetchall()
+
+
+def detect_interval(names):
+    for interval, prefix in INTERVAL_PREFIXES.items():
+        if any(name.startswith(prefix) for name in names):
+            return interval
+    return None
+
+
+def get_index_definitions(cursor):
+    cursor.execute(
+        'SELECT pg_get_indexdef(indexrelid) FROM pg_index '
+        'WHERE indrelid = %s::regclass AND NOT indisprimary',
+        [TABLE]
+    )
+    return [row[0] for row in cursor.fetchall()]
+
+
+def get_foreign_keys(cursor):
+    cursor.execute(
+        'SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint '
+        "WHERE conrelid = %s::regclass AND contype = 'f'",
+        [TABLE]
+    )
+    return cursor.fetchall()
+
+
+def create_partition(cursor, start, end, interval):
+    name = partition_name(start, interval)
+    cursor.execute(f'CREATE TABLE {name} (LIKE {TABLE} INCLUDING DEFAULTS)')
+    # Операции за этот период могли попасть в секцию по умолчанию: без
+    # переноса ATTACH PARTITION завершится ошибкой.
+    cursor.execute(
+        f'WITH moved AS ('
+        f'DELETE FROM {DEFAULT_PARTITION} '
+        f'WHERE date >= %s AND date < %s RETURNING *'
+        f') INSERT INTO {name} SELECT * FROM moved',
+        [start, end]
+    )
+    cursor.execute(
+        f'ALTER TABLE {TABLE} ATTACH PARTITION {name} '
+        f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    )
+    return name
+
+
+def create_partitions(cursor, start, end, interval):
+    names = {name for name, bound in get_partitions(cursor)}
+    existing = detect_interval(names)
+    if existing is not None and existing != interval:
+        raise ValueError(
+            'Секции уже нарезаны '
+            + ('по годам' if existing == YEAR else 'по месяцам')
+        )
+
+    return [
+        create_partition(cursor, period, following, interval)
+        for period, following in iter_periods(start, end, interval)
+        if partition_name(period, interval) not in names
+    ]
+
+
+def create_future_partitions(interval, ahead, today=None):
+    today = today or date.today()
+    with db_transaction.atomic(), connection.cursor() as cursor:
+        if not is_partitioned(cursor):
+            raise ValueError(
+                'Таблица операций не секционирована, сначала выполните '
+                'перенос (--migrate)'
+            )
+        if interval is None:
+            interval = detect_interval(
+                {name for name, bound in get_partitions(cursor)}
+            )
+            if interval is None:
+                raise ValueError(
+                    'Не удалось определить период секций, укажите --interval'
+                )
+        return create_partitions(
+            cursor,
+            today,
+            shift_periods(today, interval, ahead),
+            interval
+        )
+
+
+def migrate_to_partitions(interval, ahead, today=None):
+    today = today or date.today()
+    with db_transaction.atomic(), connection.cursor() as cursor:
+        if is_partitioned(cursor):
+            raise ValueError('Таблица операций уже секционирована')
+
+        cursor.execute(f'LOCK TABLE {TABLE} IN ACCESS EXCLUSIVE MODE')
+        index_definitions = get_index_definitions(cursor)
+        foreign_keys = get_foreign_keys(cursor)
+        cursor.execute(f'SELECT MIN(date), MAX(date) FROM {TABLE}')
+        first, last = cursor.fetchone()
+
+        cursor.execute(f'ALTER TABLE {TABLE} RENAME TO {OLD_TABLE}')
+        # Ключ секционирования обязан входить в первичный ключ, а identity
+        # у секционированных таблиц есть не во всех версиях PostgreSQL,
+        # поэтому id берётся из обычной последовательности.
+        cursor.execute(
+            f'CREATE TABLE {TABLE} '
+            f'(LIKE {OLD_TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS) '
+            f'PARTITION BY RANGE (date)'
+        )
+        cursor.execute(f'CREATE SEQUENCE {SEQUENCE} OWNED BY {TABLE}.id')
+        cursor.execute(
+            f'ALTER TABLE {TABLE} '
+            f"ALTER COLUMN id SET DEFAULT nextval('{SEQUENCE}')"
+        )
+        cursor.execute(
+            f'CREATE TABLE {DEFAULT_PARTITION} PARTITION OF {TABLE} DEFAULT'
+        )
+        created = create_partitions(
+            cursor,
+            min(first or today, today),
+            max(last or today, shift_periods(today, interval, ahead)),
+            interval
+        )
+
+        cursor.execute(f'INSERT INTO {TABLE} SELECT * FROM {OLD_TABLE}')
+        cursor.execute(f'DROP TABLE {OLD_TABLE}')
+
+        # Индексы и внешние ключи создаются после загрузки данных и
+        # под прежними именами, которые освободились вместе со старой
+        # таблицей.
+        cursor.execute(
+            f'ALTER TABLE {TABLE} ADD CONSTRAINT {TABLE}_pkey '
+            f'PRIMARY KEY (id, date)'
+        )
+        for name, definition in foreign_keys:
+            cursor.execute(
+                f'ALTER TABLE {TABLE} ADD CONSTRAINT {name} {definition}'
+            )
+        for definition in index_definitions:
+            cursor.execute(definition)
+        cursor.execute(
+            f"SELECT setval('{SEQUENCE}', COALESCE(MAX(id), 0) + 1, false) "
+            f'FROM {TABLE}'
+        )
+        return created
@@ -0,0 +1,169 @@
+import numpy as np
+from django.db.models import BigIntegerField, Case, IntegerField, Value, When
+from django.db.models.functions import Cast, Coalesce
+
+from .caching import (aget_cached_dashboard, aget_data_version,
+                      get_category_names)
+from .models import Transaction
+from .services import filter_transactions, run_query
+
+PERCENTILES = (50, 90, 99)
+NO_CATEGORY = 0
+
+
+def load_columns(transactions):
+    # Одна выборка кортежей без конвертеров MoneyField на каждую строку:
+    # сумма приходит целым числом копеек. Дата выбирается как есть: текст
+    # из Cast в CharField зависел бы от DateStyle сервера PostgreSQL.
+    rows = list(
+        transactions
+        .order_by()
+        .values_list(
+            'date',
+            Coalesce(
+                'category_id',
+                Value(NO_CATEGORY),
+                output_field=IntegerField()
+            ),
+            Case(
+                When(transaction_type=Transaction.INCOME, then=Value(1)),
+                default=Value(0),
+                output_field=IntegerField()
+            ),
+            Cast('amount', output_field=BigIntegerField())
+        )
+    )
+    if not rows:
+        return None
+
+    dates, category_ids, is_income, amounts = zip(*rows)
+    return {
+        'month': np.array(
+            [value.isoformat() for value in dates],
+            dtype='datetime64[D]'
+        ).astype('datetime64[M]'),
+        'category_id': np.array(category_ids, dtype=np.int64),
+        'is_income': np.array(is_income, dtype=bool),
+        'amount': np.array(amounts, dtype=np.int64),
+    }
+
+
+def month_labels(months):
+    return [str(month) for month in months]
+
+
+def build_pivot(columns, months):
+    expense = ~columns['is_income']
+    category_ids, category_index = np.unique(
+        columns['category_id'][expense],
+        return_inverse=True
+    )
+    month_index = np.searchsorted(months, columns['month'][expense])
+
+    matrix = np.zeros((len(category_ids), len(months)), dtype=np.int64)
+    np.add.at(
+        matrix,
+        (category_index, month_index),
+        columns['amount'][expense]
+    )
+    return category_ids, matrix
+
+
+def build_balance(columns, months):
+    month_index = np.searchsorted(months, columns['month'])
+    income = np.zeros(len(months), dtype=np.int64)
+    expense = np.zeros(len(months), dtype=np.int64)
+    is_income = columns['is_income']
+    np.add.at(income, month_index[is_income], columns['amount'][is_income])
+    np.add.at(expense, month_index[~is_income], columns['amount'][~is_income])
+    net = income - expense
+    return income, expense, net, np.cumsum(net)
+
+
+def build_percentiles(columns, category_ids):
+    expense = ~columns['is_income']
+    amounts = columns['amount'][expense]
+    by_category = columns['category_id'][expense]
+
+    order = np.argsort(by_category, kind='stable')
+    groups = np.split(
+        amounts[order],
+        np.searchsorted(by_category[order], category_ids[1:])
+    )
+    return (
+        np.percentile(amounts, PERCENTILES).round().astype(np.int64),
+        [
+            np.percentile(group, PERCENTILES).round().astype(np.int64)
+            for group in groups
+        ],
+    )
+
+
+def build_report(user, transactions):
+    columns = load_columns(transactions)
+    if columns is None:
+        return {
+            'months': [],
+            'categories': [],
+            'totals': None,
+            'balance': None,
+            'percentiles': PERCENTILES,
+        }
+
+    # Все месяцы периода подряд, включая месяцы без операций.
+    months = np.arange(
+        columns['month'].min(),
+        columns['month'].max() + 1
+    )
+    category_ids, matrix = build_pivot(columns, months)
+    income, expense, net, cumulative = build_balance(columns, months)
+
+    names = get_category_names(user.id)
+    categories = [
+        {
+            'category_id': int(category_id) or None,
+            'category': names.get(int(category_id), ''),
+            'months': row.tolist(),
+            'total': int(row.sum()),
+        }
+        for category_id, row in zip(category_ids, matrix)
+    ]
+    if categories:
+        overall, per_category = build_percentiles(columns, category_ids)
+        for category, values in zip(categories, per_category):
+            category['percentiles'] = values.tolist()
+    else:
+        overall = np.zeros(len(PERCENTILES), dtype=np.int64)
+    categories.sort(key=lambda item: item['total'], reverse=True)
+
+    return {
+        'months': month_labels(months),
+        'categories': categories,
+        'totals': {
+            'months': matrix.sum(axis=0).tolist(),
+            'total': int(matrix.sum()),
+            'percentiles': overall.tolist(),
+        },
+        'balance': {
+            'income': income.tolist(),
+            'expense': expense.tolist(),
+            'net': net.tolist(),
+            'cumulative': cumulative.tolist(),
+        },
+        'percentiles': PERCENTILES,
+    }
+
+
+async def aget_report(user, params):
+    data_version = await aget_data_version(user.id)
+    return await aget_cached_dashboard(
+        user.id,
+        data_version.version,
+        'report',
+        params,
+        lambda: run_query(
+            build_report,
+            user,
+            filter_transactions(user, params)
+        )
+    )
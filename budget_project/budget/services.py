@@ -0,0 +1,285 @@
+import asyncio
+import base64
+import json
+from collections import defaultdict
+from contextlib import ExitStack
+from datetime import date, timedelta
+from decimal import Decimal
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections, connection
+from django.db.models import BigIntegerField, Count, Q, Sum
+from django.db.models.functions import Cast, TruncMonth
+from django.utils import formats
+
+from .middleware import active_recorder
+from .models import MonthlySummary, Transaction
+
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+# Входит в ETag графиков: увеличивается при любом изменении формата ответа,
+# чтобы браузер не получил 304 на тело в старом формате (2 — копейки).
+CHART_FORMAT_VERSION = 2
+
+CHART_KEYS = (
+    'labels_expense',
+    'data_expense',
+    'labels_income',
+    'data_income',
+    'pie_labels',
+    'pie_data',
+)
+
+
+def get_filter_params(query_dict):
+    return {
+        'start_date': query_dict.get('start_date') or '',
+        'end_date': query_dict.get('end_date') or '',
+        'q': (query_dict.get('q') or '').strip(),
+        'category': query_dict.get('category') or '',
+    }
+
+
+def filter_transactions(user, params):
+    transactions = Transaction.objects.filter(user=user)
+
+    if params['start_date'] and params['end_date']:
+        transactions = transactions.filter(
+            date__gte=params['start_date'],
+            date__lte=params['end_date']
+        )
+
+    if params['q']:
+        transactions = transactions.filter(description__icontains=params['q'])
+
+    if params['category']:
+        transactions = transactions.filter(category_id=params['category'])
+
+    return transactions
+
+
+def encode_cursor(transaction):
+    raw = f'{transaction.date.isoformat()}|{transaction.id}'
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        date_str, pk = raw.split('|')
+        cursor = date.fromisoformat(date_str), int(pk)
+    except (ValueError, UnicodeError):
+        return None
+    # id вне диапазона bigint мог появиться только из подделанного курсора.
+    if not 0 < cursor[1] < 2 ** 63:
+        return None
+    return cursor
+
+
+def paginate_transactions(transactions, cursor=None, limit=PAGE_SIZE):
+    transactions = transactions.order_by('-date', '-id')
+
+    if cursor:
+        cursor_date, cursor_id = cursor
+        transactions = transactions.filter(
+            Q(date__lt=cursor_date) | Q(date=cursor_date, id__lt=cursor_id)
+        )
+
+    return transactions[:limit + 1]
+
+
+def split_page(page, limit):
+    next_cursor = encode_cursor(page[limit - 1]) if len(page) > limit else None
+    return page[:limit], next_cursor
+
+
+def sum_kopecks(field, **extra):
+    # Суммы хранятся в копейках; приведение к bigint отдаёт их целым числом
+    # в обход MoneyField, так что графикам не нужны Decimal и float().
+    return Cast(Sum(field, **extra), output_field=BigIntegerField())
+
+
+def kopecks_to_rubles(value):
+    return Decimal(value or 0).scaleb(-2)
+
+
+def get_monthly_series(transactions):
+    rows = (
+        transactions
+        .annotate(month=TruncMonth('date'))
+        .values('month')
+        .annotate(
+            income=sum_kopecks(
+                'amount',
+                filter=Q(transaction_type=Transaction.INCOME)
+            ),
+            expense=sum_kopecks(
+                'amount',
+                filter=~Q(transaction_type=Transaction.INCOME)
+            ),
+        )
+        .order_by('month')
+    )
+
+    return build_monthly_series(
+        (row['month'], row['income'], row['expense']) for row in rows
+    )
+
+
+def build_monthly_series(rows):
+    labels = []
+    data_income = []
+    data_expense = []
+    for month, income, expense in rows:
+        labels.append(formats.date_format(month, 'M Y'))
+        data_income.append(income or 0)
+        data_expense.append(expense or 0)
+
+    return {
+        'labels_expense': labels,
+        'data_expense': data_expense,
+        'labels_income': labels,
+        'data_income': data_income,
+    }
+
+
+def get_dashboard_summary(transactions):
+    rows = (
+        transactions
+        .values('transaction_type', 'category__name')
+        .annotate(total=sum_kopecks('amount'), count=Count('id'))
+        .order_by()
+    )
+
+    return build_summary(rows)
+
+
+def build_summary(rows):
+    total_income = 0
+    total_expense = 0
+    total_count = 0
+    expense_by_category = defaultdict(int)
+    for row in rows:
+        total_count += row['count']
+        if row['transaction_type'] == Transaction.INCOME:
+            total_income += row['total']
+        elif row['transaction_type'] == Transaction.EXPENSE:
+            total_expense += row['total']
+            expense_by_category[row['category__name']] += row['total']
+
+    pie = sorted(
+        expense_by_category.items(),
+        key=lambda item: item[1],
+        reverse=True
+    )
+
+    return {
+        'total_income': kopecks_to_rubles(total_income),
+        'total_expense': kopecks_to_rubles(total_expense),
+        'total_transactions_count': total_count,
+        'pie_labels': [name for name, total in pie],
+        'pie_data': [total for name, total in pie],
+    }
+
+
+def covers_whole_months(params):
+    if params['q']:
+        return False
+    if not (params['start_date'] and params['end_date']):
+        return True
+    try:
+        start = date.fromisoformat(params['start_date'])
+        end = date.fromisoformat(params['end_date'])
+    except ValueError:
+        return False
+    return start.day == 1 and (end + timedelta(days=1)).day == 1
+
+
+def get_summary_from_monthly_table(user, params):
+    summaries = MonthlySummary.objects.filter(user=user)
+    if params['start_date'] and params['end_date']:
+        summaries = summaries.filter(
+            month__gte=params['start_date'],
+            month__lte=params['end_date']
+        )
+    if params['category']:
+        summaries = summaries.filter(category_id=params['category'])
+
+    rows = list(
+        summaries
+        .values('month', 'transaction_type', 'category__name')
+        .annotate(total=sum_kopecks('total'), count=Sum('count'))
+        .order_by()
+    )
+
+    monthly = defaultdict(lambda: {'income': 0, 'expense': 0})
+    for row in rows:
+        if row['transaction_type'] == Transaction.INCOME:
+            monthly[row['month']]['income'] += row['total']
+        else:
+            monthly[row['month']]['expense'] += row['total']
+
+    return {
+        **build_summary(rows),
+        **build_monthly_series(
+            (month, values['income'], values['expense'])
+            for month, values in sorted(monthly.items())
+        ),
+    }
+
+
+def call_with_own_connection(func, *args):
+    close_old_connections()
+    try:
+        with ExitStack() as stack:
+            recorder = active_recorder.get()
+            if recorder is not None:
+                stack.enter_context(connection.execute_wrapper(recorder))
+            return func(*args)
+    finally:
+        close_old_connections()
+
+
+async def run_query(func, *args):
+    # Асинхронный ORM Django выполняет запросы в одном потоке по очереди,
+    # поэтому для параллельности каждый запрос идёт в отдельном потоке
+    # со своим соединением.
+    if not settings.DASHBOARD_PARALLEL_QUERIES:
+        return await sync_to_async(func)(*args)
+    return await sync_to_async(
+        call_with_own_connection,
+        thread_sensitive=False
+    )(func, *args)
+
+
+async def aget_dashboard_payload(user, params, transactions):
+    if covers_whole_months(params):
+        return await run_query(get_summary_from_monthly_table, user, params)
+    summary, monthly_series = await asyncio.gather(
+        run_query(get_dashboard_summary, transactions),
+        run_query(get_monthly_series, transactions),
+    )
+    return {**summary, **monthly_series}
+
+
+def serialize_chart_data(payload):
+    # Суммы в копейках — целые числа, поэтому хватает стандартного
+    # кодировщика без DjangoJSONEncoder и без пробелов-разделителей.
+    return json.dumps(
+        {key: payload[key] for key in CHART_KEYS},
+        ensure_ascii=False,
+        separators=(',', ':')
+    )
+
+
+async def aget_chart_json(user, params, transactions):
+    return serialize_chart_data(
+        await aget_dashboard_payload(user, params, transactions)
+    )
+
+
+async def aget_dashboard_totals(user, params, transactions):
+    if covers_whole_months(params):
+        return await run_query(get_summary_from_monthly_table, user, params)
+    return await run_query(get_dashboard_summary, transactions)
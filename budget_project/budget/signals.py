@@ -0,0 +1,74 @@
+from django.db.models import QuerySet
+from django.db.models.signals import (post_delete, post_save, pre_delete,
+                                      pre_save)
+from django.dispatch import receiver
+
+from .caching import invalidate_categories, mark_data_changed
+from .models import Category, Transaction
+from .summaries import apply_delta, fold_category, get_summary_state
+
+
+def deleted_directly(model, origin):
+    # При удалении пользователя сводки удаляются каскадом вместе с ним,
+    # поэтому поддерживать их нужно только при прямом удалении объектов.
+    if isinstance(origin, QuerySet):
+        return origin.model is model
+    return isinstance(origin, model)
+
+
+@receiver(post_save, sender=Transaction)
+@receiver(post_save, sender=Category)
+def mark_changed_on_save(sender, instance, **kwargs):
+    mark_data_changed(instance.user_id)
+
+
+@receiver(post_delete, sender=Transaction)
+@receiver(post_delete, sender=Category)
+def mark_changed_on_delete(sender, instance, origin=None, **kwargs):
+    if deleted_directly(sender, origin):
+        mark_data_changed(instance.user_id)
+
+
+@receiver(post_save, sender=Category)
+def invalidate_categories_on_save(sender, instance, **kwargs):
+    invalidate_categories(instance.user_id)
+
+
+@receiver(post_delete, sender=Category)
+def invalidate_categories_on_delete(sender, instance, origin=None, **kwargs):
+    # Иначе при удалении пользователя версия категорий создалась бы заново
+    # для уже удалённой строки пользователя.
+    if deleted_directly(sender, origin):
+        invalidate_categories(instance.user_id)
+
+
+@receiver(pre_save, sender=Transaction)
+def remember_summary_state(sender, instance, raw=False, **kwargs):
+    instance._summary_state = None
+    if raw or instance.pk is None:
+        return
+    previous = Transaction.objects.filter(pk=instance.pk).first()
+    if previous is not None:
+        instance._summary_state = get_summary_state(previous)
+
+
+@receiver(post_save, sender=Transaction)
+def update_summary_on_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_summary_state', None)
+    if previous is not None:
+        apply_delta(previous, -1)
+    apply_delta(get_summary_state(instance), 1)
+
+
+@receiver(post_delete, sender=Transaction)
+def update_summary_on_delete(sender, instance, origin=None, **kwargs):
+    if deleted_directly(Transaction, origin):
+        apply_delta(get_summary_state(instance), -1)
+
+
+@receiver(pre_delete, sender=Category)
+def fold_category_summary(sender, instance, origin=None, **kwargs):
+    if deleted_directly(Category, origin):
+        fold_category(instance)
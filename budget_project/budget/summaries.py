@@ -0,0 +1,143 @@
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction as db_transaction
+from django.db.models import Count, F, Sum, Value
+from django.db.models.functions import TruncMonth
+
+from .models import MonthlySummary, Transaction
+
+SUMMARY_FIELDS = ('user_id', 'month', 'category_id', 'transaction_type')
+
+
+def month_start(value):
+    return value.replace(day=1)
+
+
+def next_month_start(value):
+    return (month_start(value) + timedelta(days=32)).replace(day=1)
+
+
+def get_summary_state(transaction):
+    date = Transaction._meta.get_field('date').to_python(transaction.date)
+    amount = Transaction._meta.get_field('amount').to_python(
+        transaction.amount
+    )
+    return {
+        'user_id': transaction.user_id,
+        'month': month_start(date),
+        'category_id': transaction.category_id,
+        'transaction_type': transaction.transaction_type,
+        'amount': amount,
+    }
+
+
+def add_to_summary(lookup, total, count):
+    rows = MonthlySummary.objects.filter(**lookup)
+    # Без явного поля слагаемое ушло бы в БД рублями, а не копейками.
+    delta = Value(total, output_field=MonthlySummary._meta.get_field('total'))
+
+    with db_transaction.atomic():
+        updated = rows.update(
+            total=F('total') + delta,
+            count=F('count') + count
+        )
+        if not updated and count > 0:
+            try:
+                with db_transaction.atomic():
+                    MonthlySummary.objects.create(
+                        total=total,
+                        count=count,
+                        **lookup
+                    )
+            except IntegrityError:
+                rows.update(
+                    total=F('total') + delta,
+                    count=F('count') + count
+                )
+        rows.filter(count__lte=0).delete()
+
+
+def apply_delta(state, sign):
+    add_to_summary(
+        {field: state[field] for field in SUMMARY_FIELDS},
+        sign * state['amount'],
+        sign
+    )
+
+
+def fold_category(category):
+    with db_transaction.atomic():
+        for row in MonthlySummary.objects.filter(category=category):
+            add_to_summary(
+                {
+                    'user_id': row.user_id,
+                    'month': row.month,
+                    'category_id': None,
+                    'transaction_type': row.transaction_type,
+                },
+                row.total,
+                row.count
+            )
+            row.delete()
+
+
+def aggregate_transactions(transactions):
+    return (
+        transactions
+        .annotate(month=TruncMonth('date'))
+        .values(*SUMMARY_FIELDS)
+        .annotate(total=Sum('amount'), count=Count('id'))
+        .order_by()
+    )
+
+
+def rebuild_monthly_summary(users=None, start=None, end=None):
+    transactions = Transaction.objects.all()
+    summaries = MonthlySummary.objects.all()
+    if users is not None:
+        transactions = transactions.filter(user__in=users)
+        summaries = summaries.filter(user__in=users)
+    if start is not None:
+        transactions = transactions.filter(date__gte=month_start(start))
+        summaries = summaries.filter(month__gte=month_start(start))
+    if end is not None:
+        transactions = transactions.filter(date__lt=next_month_start(end))
+        summaries = summaries.filter(month__lt=next_month_start(end))
+
+    with db_transaction.atomic():
+        summaries.delete()
+        MonthlySummary.objects.bulk_create(
+            (
+                MonthlySummary(**row)
+                for row in aggregate_transactions(transactions).iterator()
+            ),
+            batch_size=1000
+        )
+
+
+def verify_monthly_summary(users=None):
+    transactions = Transaction.objects.all()
+    summaries = MonthlySummary.objects.all()
+    if users is not None:
+        transactions = transactions.filter(user__in=users)
+        summaries = summaries.filter(user__in=users)
+
+    expected = {
+        tuple(row[field] for field in SUMMARY_FIELDS):
+            (row['total'], row['count'])
+        for row in aggregate_transactions(transactions)
+    }
+    actual = {
+        tuple(row[field] for field in SUMMARY_FIELDS):
+            (row['total'], row['count'])
+        for row in summaries.values(*SUMMARY_FIELDS, 'total', 'count')
+    }
+
+    return [
+        (key, expected.get(key), actual.get(key))
+        for key in sorted(
+            expected.keys() | actual.keys(),
+            key=lambda key: tuple(str(part) for part in key)
+        )
+        if expected.get(key) != actual.get(key)
+    ]
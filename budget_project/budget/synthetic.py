@@ -0,0 +1,69 @@
+import random
+from datetime import date, timedelta
+from decimal import Decimal
+
+from .caching import invalidate_categories
+from .models import Category, Transaction
+from .summaries import rebuild_monthly_summary
+
+BATCH_SIZE = 5000
+
+CATEGORY_NAMES = [
+    'Продукты', 'Транспорт', 'Кафе и рестораны', 'Коммунальные услуги',
+    'Связь', 'Здоровье', 'Одежда', 'Развлечения', 'Подарки', 'Путешествия',
+    'Образование', 'Дом', 'Авто', 'Спорт', 'Книги', 'Зарплата', 'Подработка',
+    'Кэшбэк', 'Проценты', 'Прочее',
+]
+DESCRIPTIONS = [
+    'Супермаркет', 'Такси', 'Кофе', 'Обед', 'Оплата счёта', 'Аптека',
+    'Подписка', 'Кино', 'Заправка', 'Перевод', 'Маркетплейс', '',
+]
+INCOME_SHARE = 0.1
+
+
+def create_categories(user, count):
+    names = [
+        CATEGORY_NAMES[i] if i < len(CATEGORY_NAMES) else f'Категория {i}'
+        for i in range(count)
+    ]
+    Category.objects.bulk_create(
+        Category(name=name, user=user) for name in names
+    )
+    invalidate_categories(user.id)
+    return list(Category.objects.filter(user=user, name__in=names))
+
+
+def generate_transactions(user, rows, categories=10, years=3, seed=None):
+    rng = random.Random(seed)
+    category_list = create_categories(user, categories)
+    # Закон Ципфа: несколько категорий получают большую часть операций.
+    weights = [1 / (rank + 1) for rank in range(len(category_list))]
+    days = years * 365
+    today = date.today()
+
+    batch = []
+    for i in range(rows):
+        # Свежие даты встречаются чаще: история пользователя растёт
+        # со временем.
+        offset = min(int(rng.expovariate(3 / days)), days)
+        is_income = rng.random() < INCOME_SHARE
+        if is_income:
+            amount = Decimal(rng.randint(2000000, 15000000)) / 100
+        else:
+            amount = Decimal(int(rng.lognormvariate(6.5, 1.2) * 100)) / 100
+        batch.append(Transaction(
+            user=user,
+            amount=min(max(amount, Decimal('1.00')), Decimal('99999999.99')),
+            transaction_type=(
+                Transaction.INCOME if is_income else Transaction.EXPENSE
+            ),
+            category=rng.choices(category_list, weights)[0],
+            date=today - timedelta(days=offset),
+            description=f'{rng.choice(DESCRIPTIONS)} #{i}'.strip(),
+        ))
+        if len(batch) >= BATCH_SIZE:
+            Transaction.objects.bulk_create(batch)
+            batch = []
+    Transaction.objects.bulk_create(batch)
+
+    rebuild_monthly_summary([user])
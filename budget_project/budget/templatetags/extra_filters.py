@@ -1,5 +1,7 @@
 from django import template
 
+from budget.services import kopecks_to_rubles
+
 register = template.Library()
 
 
@@ -9,3 +11,8 @@ def subtract(inc, exp):
         return float(inc) - float(exp)
     except (ValueError, TypeError):
         return 0
+
+
+@register.filter
+def rubles(kopecks):
+    return kopecks_to_rubles(kopecks)
@@ -33,11 +33,66 @@ urlpatterns = [
         views.update_transaction,
         name='update_transaction'
     ),
+    path(
+        'api/transactions/',
+        views.transactions_api,
+        name='transactions_api'
+    ),
+    path(
+        'api/transactions/bulk/',
+        views.bulk_transactions,
+        name='bulk_transactions'
+    ),
+    path(
+        'api/charts/',
+        views.chart_data,
+        name='chart_data'
+    ),
+    path(
+        'api/analytics/',
+        views.analytics,
+        name='analytics'
+    ),
+    path(
+        'api/report/',
+        views.report_api,
+        name='report_api'
+    ),
+    path(
+        'report/',
+        views.report,
+        name='report'
+    ),
     path(
         'export_csv/',
         views.export_csv,
         name='export_csv'
     ),
+    path(
+        'import_csv/',
+        views.import_csv,
+        name='import_csv'
+    ),
+    path(
+        'jobs/',
+        views.jobs,
+        name='jobs'
+    ),
+    path(
+        'jobs/create/',
+        views.create_job,
+        name='create_job'
+    ),
+    path(
+        'jobs/<int:pk>/download/',
+        views.download_job,
+        name='download_job'
+    ),
+    path(
+        'api/jobs/<int:pk>/',
+        views.job_status,
+        name='job_status'
+    ),
     path(
         'login/',
         views.login_view,
@@ -1,119 +1,230 @@
-import csv
-from collections import defaultdict
-from datetime import datetime
+import asyncio
+import io
+from datetime import date
 
+from asgiref.sync import sync_to_async
 from django.contrib import messages
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
-from django.db.models import Sum
-from django.http import HttpResponse
+from django.core.handlers.asgi import ASGIRequest
+from django.http import (FileResponse, Http404, HttpResponse, JsonResponse,
+                         StreamingHttpResponse)
 from django.shortcuts import get_object_or_404, redirect, render
+from django.template.loader import render_to_string
+from django.urls import reverse
 from django.utils import formats
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.http import require_POST
+
+from .analytics import get_spending_analytics
+from .bulk import apply_bulk_action
+from .caching import (aget_cached_dashboard, aget_data_version,
+                      get_category_names, params_digest)
+from .exports import (EXPORT_FORMATS, PYARROW_FORMATS, aiter_chunks,
+                      pyarrow_available)
+from .forms import (BulkTransactionForm, CategoryForm, ImportCSVForm,
+                    LoginForm, TransactionForm)
+from .imports import import_transactions
+from .jobs import enqueue_job
+from .models import Job, Transaction
+from .reports import aget_report
+from .services import (CHART_FORMAT_VERSION, MAX_PAGE_SIZE, PAGE_SIZE,
+                       aget_chart_json, aget_dashboard_totals,
+                       decode_cursor, filter_transactions,
+                       get_filter_params, paginate_transactions, run_query,
+                       split_page)
 
-from .forms import CategoryForm, LoginForm, TransactionForm
-from .models import Category, Transaction
+
+@login_required
+async def dashboard(request):
+    user = await request.auser()
+    params = get_filter_params(request.GET)
+    transactions = filter_transactions(user, params)
+
+    data_version = await aget_data_version(user.id)
+    totals, recent_transactions, categories = await asyncio.gather(
+        aget_cached_dashboard(
+            user.id,
+            data_version.version,
+            'totals',
+            params,
+            lambda: aget_dashboard_totals(user, params, transactions)
+        ),
+        run_query(
+            list,
+            transactions
+            .select_related('category')
+            .order_by('-date', '-id')[:5]
+        ),
+        run_query(
+            get_category_names,
+            user.id,
+            data_version.categories_version
+        ),
+    )
+
+    return await sync_to_async(render)(request, 'dashboard.html', {
+        'user': user,
+        'recent_transactions': recent_transactions,
+        'data_version': data_version.version,
+        'total_income': totals['total_income'],
+        'total_expense': totals['total_expense'],
+        'total_transactions_count': totals['total_transactions_count'],
+        'start_date': params['start_date'],
+        'end_date': params['end_date'],
+        'search_query': params['q'],
+        'selected_category': params['category'],
+        'categories': categories,
+    })
 
 
 @login_required
-def dashboard(request):
-    start_date = request.GET.get('start_date')
-    end_date = request.GET.get('end_date')
-    search_query = request.GET.get('q', '').strip()
-    category_id = request.GET.get('category')
-
-    start_date_display = start_date if start_date else ''
-    end_date_display = end_date if end_date else ''
-    search_query_display = search_query if search_query else ''
-    selected_category_display = category_id if category_id else ''
-
-    transactions = Transaction.objects.filter(user=request.user)
-
-    if start_date and end_date:
-        transactions = transactions.filter(
-            date__gte=start_date,
-            date__lte=end_date
-        )
+async def chart_data(request):
+    user = await request.auser()
+    params = get_filter_params(request.GET)
+
+    data_version = await aget_data_version(user.id)
+    version = data_version.version
+    etag = quote_etag(
+        f'v{CHART_FORMAT_VERSION}-{version}-{params_digest(params)}'
+    )
+    last_modified = (
+        int(data_version.changed_at.timestamp())
+        if data_version.changed_at else None
+    )
 
-    if search_query:
-        transactions = transactions.filter(description__icontains=search_query)
+    response = get_conditional_response(
+        request,
+        etag=etag,
+        last_modified=last_modified
+    )
+    if response is None:
+        # В кэше хранится уже сериализованный JSON.
+        content = await aget_cached_dashboard(
+            user.id,
+            version,
+            'charts_json',
+            params,
+            lambda: aget_chart_json(
+                user,
+                params,
+                filter_transactions(user, params)
+            )
+        )
+        response = HttpResponse(content, content_type='application/json')
 
-    if category_id:
-        transactions = transactions.filter(category_id=category_id)
+    response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified)
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
 
-    all_transactions = Transaction.objects.filter(
-        user=request.user
-    ).order_by('-date')
 
-    recent_transactions = all_transactions[:5]
+@login_required
+async def analytics(request):
+    user = await request.auser()
+    params = get_filter_params(request.GET)
+
+    try:
+        as_of = (
+            date.fromisoformat(params['end_date'])
+            if params['end_date'] else date.today()
+        )
+    except ValueError:
+        return JsonResponse({'error': 'Некорректная дата'}, status=400)
+
+    data_version = await aget_data_version(user.id)
+    payload = await aget_cached_dashboard(
+        user.id,
+        data_version.version,
+        'analytics',
+        {**params, 'as_of': as_of.isoformat()},
+        lambda: run_query(get_spending_analytics, user, params, as_of)
+    )
+    return JsonResponse(payload)
 
-    total_income = transactions.filter(transaction_type='income').aggregate(
-        total=Sum('amount')
-    )['total'] or 0
 
-    total_expense = transactions.filter(transaction_type='expense').aggregate(
-        total=Sum('amount')
-    )['total'] or 0
+@login_required
+async def report(request):
+    user = await request.auser()
+    params = get_filter_params(request.GET)
+    payload = await aget_report(user, params)
+
+    return await sync_to_async(render)(request, 'report.html', {
+        'user': user,
+        'report': payload,
+        'start_date': params['start_date'],
+        'end_date': params['end_date'],
+    })
 
-    monthly_data = defaultdict(lambda: {'income': 0, 'expense': 0})
 
-    for trans in transactions:
-        month_key = trans.date.strftime('%Y-%m')
-        if trans.transaction_type == 'income':
-            monthly_data[month_key]['income'] += trans.amount
-        else:
-            monthly_data[month_key]['expense'] += trans.amount
-
-    labels_expense = sorted(monthly_data.keys())
-    data_expense = [
-        float(monthly_data[month]['expense'])
-        for month in labels_expense
-    ]
-    labels_income = labels_expense
-    data_income = [
-        float(monthly_data[month]['income'])
-        for month in labels_income
-    ]
-
-    labels_expense_formatted = [
-        formats.date_format(
-            datetime.strptime(month, '%Y-%m'),
-            'M Y'
-        )
-        for month in labels_expense
-    ]
-    labels_income_formatted = labels_expense_formatted
-
-    categories = Category.objects.filter(user=request.user)
-
-    expense_by_category = (
-        transactions
-        .filter(transaction_type='expense')
-        .values('category__name')
-        .annotate(total=Sum('amount'))
-        .order_by('-total')
+@login_required
+async def report_api(request):
+    user = await request.auser()
+    return JsonResponse(
+        await aget_report(user, get_filter_params(request.GET))
     )
 
-    pie_labels = [item['category__name'] for item in expense_by_category]
-    pie_data = [float(item['total']) for item in expense_by_category]
 
-    return render(request, 'dashboard.html', {
-        'transactions': transactions,
-        'recent_transactions': recent_transactions,
-        'all_transactions': all_transactions,
-        'total_transactions_count': all_transactions.count(),
-        'total_income': total_income,
-        'total_expense': total_expense,
-        'start_date': start_date_display,
-        'end_date': end_date_display,
-        'search_query': search_query_display,
-        'selected_category': selected_category_display,
-        'categories': categories,
-        'labels_expense': labels_expense_formatted,
-        'data_expense': data_expense,
-        'labels_income': labels_income_formatted,
-        'data_income': data_income,
-        'pie_labels': pie_labels,
-        'pie_data': pie_data,
+@login_required
+async def transactions_api(request):
+    user = await request.auser()
+    transactions = filter_transactions(
+        user,
+        get_filter_params(request.GET)
+    ).select_related('category')
+
+    cursor = None
+    if request.GET.get('cursor'):
+        cursor = decode_cursor(request.GET['cursor'])
+        if cursor is None:
+            return JsonResponse({'error': 'Некорректный курсор'}, status=400)
+
+    try:
+        limit = int(request.GET.get('limit', PAGE_SIZE))
+    except ValueError:
+        limit = PAGE_SIZE
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+    page, next_cursor = split_page(
+        [
+            transaction async for transaction in
+            paginate_transactions(transactions, cursor, limit)
+        ],
+        limit
+    )
+
+    if request.GET.get('format') == 'html':
+        data_version = await aget_data_version(user.id)
+        html = await sync_to_async(render_to_string)(
+            'includes/transaction_rows.html',
+            {'transactions': page, 'data_version': data_version.version}
+        )
+        return JsonResponse({'html': html, 'next_cursor': next_cursor})
+
+    return JsonResponse({
+        'results': [
+            {
+                'id': transaction.id,
+                'date': transaction.date.isoformat(),
+                'date_display': formats.date_format(transaction.date, 'd.m.Y'),
+                'transaction_type': transaction.transaction_type,
+                'amount': str(transaction.amount),
+                'amount_display': formats.localize(transaction.amount),
+                'category': (
+                    transaction.category.name if transaction.category else ''
+                ),
+                'description': transaction.description,
+                'edit_url': reverse('edit_transaction', args=[transaction.id]),
+                'delete_url': reverse(
+                    'delete_transaction',
+                    args=[transaction.id]
+                ),
+            }
+            for transaction in page
+        ],
+        'next_cursor': next_cursor,
     })
 
 
@@ -136,7 +247,10 @@ def add_category(request):
 @login_required
 def add_transaction(request):
     if request.method == 'POST':
-        form = TransactionForm(request.POST)
+        form = TransactionForm(
+            request.POST,
+            category_names=get_category_names(request.user.id)
+        )
         if form.is_valid():
             transaction = form.save(commit=False)
             transaction.user = request.user
@@ -144,9 +258,8 @@ def add_transaction(request):
             messages.success(request, 'Операция добавлена!')
             return redirect('dashboard')
     else:
-        form = TransactionForm()
-        form.fields['category'].queryset = Category.objects.filter(
-            user=request.user
+        form = TransactionForm(
+            category_names=get_category_names(request.user.id)
         )
     return render(request, 'transaction_form.html', {'form': form})
 
@@ -154,7 +267,10 @@ def add_transaction(request):
 @login_required
 def edit_transaction(request, pk):
     transaction = get_object_or_404(Transaction, id=pk, user=request.user)
-    form = TransactionForm(instance=transaction)
+    form = TransactionForm(
+        instance=transaction,
+        category_names=get_category_names(request.user.id)
+    )
     return render(request, 'edit_transaction.html', {
         'form': form,
         'transaction': transaction
@@ -165,7 +281,11 @@ def edit_transaction(request, pk):
 def update_transaction(request, pk):
     if request.method == 'POST':
         transaction = get_object_or_404(Transaction, id=pk, user=request.user)
-        form = TransactionForm(request.POST, instance=transaction)
+        form = TransactionForm(
+            request.POST,
+            instance=transaction,
+            category_names=get_category_names(request.user.id)
+        )
         if form.is_valid():
             form.save()
             messages.success(request, 'Операция обновлена!')
@@ -188,41 +308,162 @@ def delete_transaction(request, pk):
 
 
 @login_required
-def export_csv(request):
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="transactions.csv"'
-
-    writer = csv.writer(response)
-    writer.writerow(['Дата', 'Тип', 'Сумма (₽)', 'Категория', 'Описание'])
-
-    transactions = Transaction.objects.filter(user=request.user)
-    start_date = request.GET.get('start_date')
-    end_date = request.GET.get('end_date')
-    search_query = request.GET.get('q')
-    category_id = request.GET.get('category')
-
-    if start_date and end_date:
-        transactions = transactions.filter(
-            date__gte=start_date,
-            date__lte=end_date
+@require_POST
+def bulk_transactions(request):
+    form = BulkTransactionForm(request.POST, user=request.user)
+    if not form.is_valid():
+        return JsonResponse(
+            {
+                'errors': {
+                    field: list(errors)
+                    for field, errors in form.errors.items()
+                }
+            },
+            status=400
         )
-    if search_query:
-        transactions = transactions.filter(description__icontains=search_query)
-    if category_id:
-        transactions = transactions.filter(category_id=category_id)
-
-    for transaction in transactions:
-        writer.writerow([
-            transaction.date,
-            transaction.get_transaction_type_display(),
-            transaction.amount,
-            transaction.category.name if transaction.category else '',
-            transaction.description
-        ])
 
+    transactions = filter_transactions(
+        request.user,
+        get_filter_params(request.GET)
+    )
+    if not form.cleaned_data['select_all']:
+        transactions = transactions.filter(id__in=form.cleaned_data['ids'])
+
+    count = apply_bulk_action(
+        request.user,
+        transactions,
+        form.cleaned_data['action'],
+        category=form.cleaned_data['category'],
+        transaction_type=form.cleaned_data['transaction_type']
+    )
+    return JsonResponse({
+        'action': form.cleaned_data['action'],
+        'count': count,
+    })
+
+
+@login_required
+def export_csv(request):
+    export_format = request.GET.get('format') or 'csv'
+    if export_format not in EXPORT_FORMATS:
+        messages.error(request, 'Неизвестный формат экспорта.')
+        return redirect('dashboard')
+    if export_format in PYARROW_FORMATS and not pyarrow_available():
+        messages.error(
+            request,
+            'Экспорт в Parquet и Arrow недоступен: не установлен pyarrow.'
+        )
+        return redirect('dashboard')
+
+    transactions = filter_transactions(
+        request.user,
+        get_filter_params(request.GET)
+    ).order_by('-date', '-id')
+
+    content_type, filename, iter_export = EXPORT_FORMATS[export_format]
+    content = iter_export(transactions, get_category_names(request.user.id))
+    if isinstance(request, ASGIRequest):
+        content = aiter_chunks(content)
+    response = StreamingHttpResponse(content, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
     return response
 
 
+@login_required
+def import_csv(request):
+    result = None
+    if request.method == 'POST':
+        form = ImportCSVForm(request.POST, request.FILES)
+        if form.is_valid():
+            lines = io.TextIOWrapper(
+                form.cleaned_data['file'].file,
+                encoding='utf-8-sig',
+                newline=''
+            )
+            result = import_transactions(request.user, lines)
+            if result.created:
+                messages.success(
+                    request,
+                    f'Импортировано операций: {result.created} '
+                    f'({result.rows_per_second:.0f} строк/с)'
+                )
+            if not result.error_count:
+                return redirect('dashboard')
+    else:
+        form = ImportCSVForm()
+    return render(request, 'import_form.html', {
+        'form': form,
+        'result': result
+    })
+
+
+JOB_RESULT_NAMES = {
+    Job.EXPORT_CSV: 'transactions.csv',
+    Job.REPORT: 'report.json',
+}
+
+
+def job_payload(job):
+    return {
+        'id': job.id,
+        'kind': job.kind,
+        'status': job.status,
+        'status_display': job.get_status_display(),
+        'created_at': job.created_at.isoformat(),
+        'finished_at': job.finished_at and job.finished_at.isoformat(),
+        'error': job.error,
+        'download_url': (
+            reverse('download_job', args=[job.id])
+            if job.status == Job.DONE else None
+        ),
+    }
+
+
+@login_required
+@require_POST
+def create_job(request):
+    kind = request.POST.get('kind')
+    if kind not in JOB_RESULT_NAMES:
+        return JsonResponse({'error': 'Неизвестный тип задачи'}, status=400)
+
+    job = enqueue_job(request.user, kind, get_filter_params(request.GET))
+    if job is None:
+        messages.error(
+            request,
+            'Слишком много задач в работе, дождитесь их завершения.'
+        )
+    else:
+        messages.success(request, f'Задача #{job.id} поставлена в очередь.')
+    return redirect('jobs')
+
+
+@login_required
+def jobs(request):
+    return render(request, 'jobs.html', {
+        'jobs': Job.objects.filter(user=request.user)[:20],
+    })
+
+
+@login_required
+def job_status(request, pk):
+    job = get_object_or_404(Job, id=pk, user=request.user)
+    return JsonResponse(job_payload(job))
+
+
+@login_required
+def download_job(request, pk):
+    job = get_object_or_404(Job, id=pk, user=request.user, status=Job.DONE)
+    try:
+        file = open(job.result_file, 'rb')
+    except OSError:
+        raise Http404('Файл результата не найден')
+    return FileResponse(
+        file,
+        as_attachment=True,
+        filename=JOB_RESULT_NAMES[job.kind]
+    )
+
+
 def login_view(request):
     if request.method == 'POST':
         form = LoginForm(data=request.POST)
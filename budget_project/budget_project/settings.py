@@ -43,6 +43,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'budget.middleware.RequestProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -58,8 +59,13 @@ TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [os.path.join(BASE_DIR, 'templates')],
-        'APP_DIRS': True,
         'OPTIONS': {
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -76,15 +82,123 @@ WSGI_APPLICATION = 'budget_project.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/3.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.postgresql',
-        'NAME': config('DB_NAME'),
-        'USER': config('DB_USER'),
-        'PASSWORD': config('DB_PASSWORD'),
-        'HOST': config('DB_HOST', 'localhost'),
-        'PORT': config('DB_PORT', '5432'),
+if config('DB_ENGINE', 'postgresql') == 'sqlite3':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': config('DB_NAME'),
+            'USER': config('DB_USER'),
+            'PASSWORD': config('DB_PASSWORD'),
+            'HOST': config('DB_HOST', 'localhost'),
+            'PORT': config('DB_PORT', '5432'),
+        }
+    }
+
+# Пул соединений psycopg 3 несовместим с постоянными соединениями Django,
+# поэтому при DB_POOL=True CONN_MAX_AGE всегда 0.
+DB_POOL = config('DB_POOL', default=False, cast=bool)
+
+DATABASES['default']['CONN_MAX_AGE'] = (
+    0 if DB_POOL else config('DB_CONN_MAX_AGE', default=0, cast=int)
+)
+DATABASES['default']['CONN_HEALTH_CHECKS'] = config(
+    'DB_CONN_HEALTH_CHECKS',
+    default=True,
+    cast=bool
+)
+if DB_POOL:
+    DATABASES['default']['OPTIONS'] = {
+        'pool': {
+            'min_size': config('DB_POOL_MIN_SIZE', default=2, cast=int),
+            'max_size': config('DB_POOL_MAX_SIZE', default=10, cast=int),
+            'timeout': config('DB_POOL_TIMEOUT', default=10, cast=int),
+        },
+    }
+
+CACHE_BACKEND = config('CACHE_BACKEND', 'locmem')
+
+if CACHE_BACKEND == 'file':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': config(
+                'CACHE_LOCATION',
+                os.path.join(BASE_DIR, '.cache')
+            ),
+        }
+    }
+elif CACHE_BACKEND == 'db':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': config('CACHE_LOCATION', 'budget_cache'),
+        }
     }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        },
+        # Фрагменты строк таблицы: по одному на операцию, поэтому
+        # лимит записей больше стандартных 300.
+        'template_fragments': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'template_fragments',
+            'OPTIONS': {
+                'MAX_ENTRIES': config(
+                    'TEMPLATE_FRAGMENTS_MAX_ENTRIES',
+                    20000,
+                    cast=int
+                ),
+            },
+        },
+    }
+
+DASHBOARD_CACHE_TIMEOUT = config('DASHBOARD_CACHE_TIMEOUT', 300, cast=int)
+CATEGORY_CACHE_TIMEOUT = config('CATEGORY_CACHE_TIMEOUT', 3600, cast=int)
+# Параллельные запросы главной открывают по соединению на каждый поток:
+# без пула это несколько новых подключений на каждый промах кэша.
+DASHBOARD_PARALLEL_QUERIES = config(
+    'DASHBOARD_PARALLEL_QUERIES',
+    default=DB_POOL,
+    cast=bool
+)
+
+JOBS_DIR = config('JOBS_DIR', default=os.path.join(BASE_DIR, 'jobs'))
+JOBS_MAX_PER_USER = config('JOBS_MAX_PER_USER', default=2, cast=int)
+JOBS_STALE_TIMEOUT = config('JOBS_STALE_TIMEOUT', default=300, cast=int)
+JOBS_RETENTION_DAYS = config('JOBS_RETENTION_DAYS', default=7, cast=int)
+
+PROFILING_ENABLED = config('PROFILING_ENABLED', default=False, cast=bool)
+PROFILING_SAMPLE_RATE = config('PROFILING_SAMPLE_RATE', default=0, cast=float)
+PROFILING_SLOW_QUERIES = config('PROFILING_SLOW_QUERIES', default=5, cast=int)
+PROFILING_DIR = config(
+    'PROFILING_DIR',
+    default=os.path.join(BASE_DIR, 'profiles')
+)
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'budget.profiling': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
 }
 
 # Password validation